@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+数据获取离线基准
+以回放模式运行步骤1（价格）和步骤2（EPS），不访问网络，测量重试、限速并发和缓存逻辑的用时：
+- cold: 没有任何本地快照和缓存
+- warm: 紧接着再运行一次，快照和EPS缓存均有效
+
+夹具来自 get_data/akshare_replay.py 录制的真实响应（--fixtures），
+未指定时按自选表合成夹具，每次调用的延迟由 --latency 决定
+
+用法:
+    python benchmarks/bench_fetch.py --latency 0.2 --failure-rate 0.1
+    python get_data/akshare_replay.py && python benchmarks/bench_fetch.py --fixtures data/fixtures/akshare
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from get_data.akshare_replay import MODE_REPLAY, AkshareReplay, set_default_replay  # noqa: E402
+from get_data.watchlist import load_watchlist_codes  # noqa: E402
+
+EPS_INDICATOR = "预测年报每股收益"
+
+
+def synthesize_fixtures(fixture_dir: str, codes, latency: float):
+    """按自选股合成全市场快照、个股行情和EPS预测的夹具"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    replay = AkshareReplay(MODE_REPLAY, fixture_dir)
+    market = [f"{code:06d}" for code in rng.choice(1_000_000, size=5000, replace=False)]
+    spot_codes = list(dict.fromkeys(list(codes) + market))
+    replay.save_fixture('stock_zh_a_spot_em', {}, pd.DataFrame({
+        '代码': spot_codes,
+        '名称': [f"公司{i}" for i in range(len(spot_codes))],
+        '最新价': np.round(rng.uniform(2, 300, size=len(spot_codes)), 2),
+        '总市值': rng.uniform(1e9, 5e11, size=len(spot_codes)),
+    }), elapsed=latency)
+    for code in codes:
+        replay.save_fixture('stock_individual_info_em', {'symbol': code}, pd.DataFrame({
+            'item': ['股票代码', '股票简称', '最新', '总市值'],
+            'value': [code, f"公司{code}", round(float(rng.uniform(2, 300)), 2), float(rng.uniform(1e9, 5e11))],
+        }), elapsed=latency)
+        replay.save_fixture('stock_profit_forecast_ths', {'symbol': code, 'indicator': EPS_INDICATOR}, pd.DataFrame({
+            # 与akshare一致，年度为字符串
+            '年度': ['2024', '2025', '2026'],
+            '预测机构数': [5, 5, 4],
+            '最小值': np.round(rng.uniform(0, 2, size=3), 4),
+            '均值': np.round(rng.uniform(0, 5, size=3), 4),
+            '最大值': np.round(rng.uniform(2, 8, size=3), 4),
+            '行业平均数': np.round(rng.uniform(0, 3, size=3), 4),
+        }), elapsed=latency)
+
+
+def run_steps(cs, replay: AkshareReplay, label: str) -> bool:
+    before = dict(replay.stats)
+    start = time.perf_counter()
+    df_price = cs.step1_get_stock_price()
+    price_s = time.perf_counter() - start
+    start = time.perf_counter()
+    df_eps = cs.step2_get_eps_data()
+    eps_s = time.perf_counter() - start
+    calls = {name: count - before.get(name, 0) for name, count in replay.stats.items()
+             if name != 'injected_failures' and count != before.get(name, 0)}
+    ok = df_price is not False and df_eps is not False
+    print(f"{label:<5} 价格 {price_s:7.2f} 秒  EPS {eps_s:7.2f} 秒  {'✅' if ok else '❌'}  调用: {calls or '无'}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="数据获取离线基准（akshare回放）")
+    parser.add_argument('--fixtures', metavar='DIR', help="录制的夹具目录，默认合成夹具")
+    parser.add_argument('--watchlist', default=os.path.join(REPO_ROOT, 'fromyouwei.xlsx'), help="自选股Excel")
+    parser.add_argument('--latency', type=float, default=None,
+                        help="每次调用的回放延迟（秒），默认使用录制用时（合成夹具为0.1秒）")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="注入失败的比例")
+    parser.add_argument('--seed', type=int, default=0, help="失败注入的随机种子")
+    parser.add_argument('--verbose', action='store_true', help="输出步骤日志")
+    args = parser.parse_args()
+
+    codes = load_watchlist_codes(args.watchlist)
+    with tempfile.TemporaryDirectory() as workdir:
+        fixture_dir = args.fixtures and os.path.abspath(args.fixtures)
+        if not fixture_dir:
+            fixture_dir = os.path.join(workdir, 'fixtures')
+            synthesize_fixtures(fixture_dir, codes, 0.1)
+        shutil.copy(args.watchlist, os.path.join(workdir, 'fromyouwei.xlsx'))
+
+        # complete_sync导入时在当前目录创建日志文件，数据文件也使用相对路径
+        os.chdir(workdir)
+        import complete_sync as cs
+        logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+        replay = AkshareReplay(MODE_REPLAY, fixture_dir, latency=args.latency,
+                               failure_rate=args.failure_rate, seed=args.seed)
+        set_default_replay(replay)
+        print(f"自选股 {len(codes)} 只，夹具: {args.fixtures or '合成'}，"
+              f"延迟 {args.latency if args.latency is not None else '录制用时'}，"
+              f"注入失败 {args.failure_rate:.0%}（种子 {args.seed}）")
+
+        ok = run_steps(cs, replay, 'cold')
+        ok = run_steps(cs, replay, 'warm') and ok
+        print(f"注入失败次数: {replay.stats.get('injected_failures', 0)}")
+        os.chdir(REPO_ROOT)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+数据处理与格式转换热点路径基准
+用合成的自选表（默认100 / 1万 / 10万行）和价格、EPS快照，测量：
+- metrics: 步骤3的指标计算（筛选2025年EPS + compute_metrics）
+- convert: ExcelToFeishuProcessor.clean_data + convert_to_feishu_records
+- coerce: FieldCoercer.records_from_dataframe（按飞书字段类型转换）
+- validate: ExcelToFeishuProcessor.validate_data
+
+输出每项的用时、吞吐量（行/秒）和峰值内存，可保存为基线并与基线比较
+
+用法:
+    python benchmarks/bench_processing.py
+    python benchmarks/bench_processing.py --sizes 100 10000 --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_processing.py --compare benchmarks/baseline.json --threshold 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from data_processor import ExcelToFeishuProcessor  # noqa: E402
+from feishu_schema import FALLBACK_FIELD_TYPES, FieldCoercer  # noqa: E402
+from stock_metrics import compute_metrics, select_eps_year  # noqa: E402
+
+DEFAULT_SIZES = [100, 10_000, 100_000]
+DEFAULT_THRESHOLD = 0.2
+# 用时差小于该值（秒）时不算回退，避免亚毫秒级测量的噪声
+MIN_TIME_DELTA = 0.001
+
+
+def make_watchlist(rows: int, seed: int = 0) -> pd.DataFrame:
+    """生成与fromyouwei.xlsx结构相同的自选表"""
+    rng = np.random.default_rng(seed)
+    codes = rng.choice(1_000_000, size=rows, replace=False)
+    exchange = np.where(codes >= 600_000, 'SH', 'SZ')
+    tickers = [f"{code:06d}.{ex}" for code, ex in zip(codes, exchange)]
+    target_low = rng.integers(5, 200, size=rows)
+    buy_low = np.round(target_low * rng.uniform(0.6, 0.9, size=rows), 0)
+    return pd.DataFrame({
+        'Ticker': tickers,
+        'Name': [f"公司{i}" for i in range(rows)],
+        'Exchange': exchange,
+        'Sector/Theme': rng.choice(['Chiplet/先进封装', '数据要素/AI安全', '算力/光模块', '创新药'], size=rows),
+        'Current Price': np.nan,
+        'PE (2025E)': np.nan,
+        'EPS (2025E)': np.nan,
+        'Market Cap (CNY bn)': np.nan,
+        'Safe Buy Low': buy_low,
+        'Safe Buy High': buy_low + 2,
+        'Extreme Safe': (buy_low - 1).astype(int),
+        'Target Low': target_low,
+        'Target High': target_low + rng.integers(1, 20, size=rows),
+        'Mid Target': np.nan,
+        'Potential Upside %': np.nan,
+        'Stop Loss': np.round(buy_low * 0.85, 1),
+        'Source / Link': np.nan,
+        'Notes': rng.choice(['分批加仓', '政策催化博弈；小仓位题材弹性', ''], size=rows),
+    })
+
+
+def make_snapshots(watchlist: pd.DataFrame, seed: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    生成价格快照和EPS数据
+
+    价格覆盖约98%的自选股并含额外的非自选股票；EPS每只股票含2024-2026三个年度
+    """
+    rng = np.random.default_rng(seed + 1)
+    codes = watchlist['Ticker'].str[:6].to_numpy()
+    covered = codes[rng.random(len(codes)) < 0.98]
+    extra = np.array([f"{code:06d}" for code in rng.choice(1_000_000, size=max(10, len(codes) // 10))])
+    price_codes = np.concatenate([covered, extra])
+    df_price = pd.DataFrame({
+        '代码': price_codes,
+        '最新价': np.round(rng.uniform(2, 300, size=len(price_codes)), 2),
+        '总市值': rng.uniform(1e9, 5e11, size=len(price_codes)),
+    })
+    # 与akshare一致，年度为字符串
+    years = ['2024', '2025', '2026']
+    df_eps = pd.DataFrame({
+        '年度': np.repeat([years], len(codes), axis=0).ravel(),
+        '均值': np.round(rng.uniform(-1, 10, size=len(codes) * len(years)), 4),
+        '股票代码': np.repeat(codes, len(years)),
+    })
+    return df_price, df_eps
+
+
+def run_metrics(watchlist, df_price, df_eps):
+    df_eps_2025 = select_eps_year(df_eps, 2025)
+    return compute_metrics(watchlist, df_price, df_eps_2025, updated_at='2025-01-01 00:00:00 CST')
+
+
+def run_convert(processed: pd.DataFrame):
+    processor = ExcelToFeishuProcessor('')
+    processor.df = processed
+    with contextlib.redirect_stdout(io.StringIO()):
+        return processor.convert_to_feishu_records(processor.clean_data())
+
+
+def run_coerce(processed: pd.DataFrame):
+    return FieldCoercer(FALLBACK_FIELD_TYPES).records_from_dataframe(processed)
+
+
+def run_validate(records: List[dict]):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ExcelToFeishuProcessor('').validate_data(records)
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """预热一次后多次计时，另跑一次用tracemalloc测量峰值内存"""
+    fn()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_s': statistics.median(durations),
+        'min_s': min(durations),
+        'peak_mb': peak / 1024 / 1024,
+    }
+
+
+def run_suite(sizes: List[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for rows in sizes:
+        watchlist = make_watchlist(rows)
+        df_price, df_eps = make_snapshots(watchlist)
+        processed = run_metrics(watchlist, df_price, df_eps)
+        records = run_convert(processed)
+        # 大数据量时减少重复次数
+        reps = repeat if rows <= 10_000 else max(1, repeat // 2)
+        cases = [
+            ('metrics', lambda: run_metrics(watchlist, df_price, df_eps)),
+            ('convert', lambda: run_convert(processed)),
+            ('coerce', lambda: run_coerce(processed)),
+            ('validate', lambda: run_validate(records)),
+        ]
+        for name, fn in cases:
+            stats = measure(fn, reps)
+            stats['rows'] = rows
+            stats['rows_per_s'] = rows / stats['median_s'] if stats['median_s'] > 0 else float('inf')
+            key = f"{name}/{rows}"
+            results[key] = stats
+            print(f"{key:<18} {stats['median_s'] * 1000:10.2f} ms  {stats['rows_per_s']:14,.0f} 行/秒  "
+                  f"峰值 {stats['peak_mb']:8.1f} MB")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """
+    返回用时或峰值内存超过基线 (1 + threshold) 倍的项
+
+    用时按最短用时比较，受机器负载波动的影响小于中位数
+    """
+    regressions = []
+    print(f"\n与基线比较 (阈值 +{threshold:.0%}):")
+    for key, stats in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"  {key:<18} 基线中没有该项")
+            continue
+        time_ratio = stats['min_s'] / base['min_s'] if base['min_s'] else 1.0
+        mem_ratio = stats['peak_mb'] / base['peak_mb'] if base['peak_mb'] else 1.0
+        time_regressed = time_ratio > 1 + threshold and stats['min_s'] - base['min_s'] > MIN_TIME_DELTA
+        regressed = time_regressed or mem_ratio > 1 + threshold
+        mark = "❌" if regressed else "✅"
+        print(f"  {mark} {key:<18} 用时 x{time_ratio:.2f}  内存 x{mem_ratio:.2f}")
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="数据处理与格式转换基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="自选表行数")
+    parser.add_argument('--repeat', type=int, default=5, help="每项重复次数（取中位数）")
+    parser.add_argument('--save-baseline', metavar='PATH', help="将结果保存为基线JSON")
+    parser.add_argument('--compare', metavar='PATH', help="与基线JSON比较，出现回退时返回非0")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="允许的回退比例，默认0.2即20%%")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, max(1, args.repeat))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到: {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n性能回退: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
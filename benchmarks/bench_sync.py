@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+飞书同步引擎离线压测
+在本地启动飞书替身服务（feishu_standin.py），测量：
+- read: 分页读取全部记录并构建Ticker映射和内容哈希（sync_state.load_remote_state）
+- write: 分块并发批量更新全部记录（RecordBatchWriter.update，含自适应限流）
+
+用法:
+    python benchmarks/bench_sync.py --records 10000 --latency 0.05
+    python benchmarks/bench_sync.py --records 100000 --rate-limit 50 --max-workers 16
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from feishu_standin import FeishuStandIn  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="飞书同步引擎离线压测")
+    parser.add_argument('--records', type=int, default=10_000, help="数据表记录数")
+    parser.add_argument('--latency', type=float, default=0.02, help="替身服务每个请求的延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument('--rate-limit', type=float, default=0, help="替身服务每秒请求数上限，0表示不限")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="随机限流比例")
+    parser.add_argument('--retry-after', type=float, default=0.2, help="限流响应建议的等待秒数")
+    parser.add_argument('--batch-size', type=int, default=500, help="每个批量请求的记录数")
+    parser.add_argument('--max-workers', type=int, default=8, help="写入并发上限")
+    parser.add_argument('--verbose', action='store_true', help="输出同步引擎日志")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+    import lark_oapi as lark
+    from feishu_http import get_lark_client
+    from feishu_records import RecordBatchWriter
+    from sync_state import load_remote_state
+
+    standin = FeishuStandIn(records=args.records, latency=args.latency, jitter=args.jitter,
+                            rate_limit=args.rate_limit, throttle_rate=args.throttle_rate,
+                            retry_after=args.retry_after)
+    with standin:
+        client = get_lark_client('cli_standin', 'standin', domain=standin.url)
+        option = lark.RequestOption.builder().user_access_token('u-standin').build()
+        print(f"替身服务: {standin.url}，{args.records} 条记录，延迟 {args.latency}s，"
+              f"限速 {args.rate_limit or '不限'}次/秒，随机限流 {args.throttle_rate:.0%}")
+
+        start = time.perf_counter()
+        ticker_map, remote_hashes = load_remote_state(client, option, 'app_standin', 'tbl_standin',
+                                                      field_names=['Ticker', 'Current Price'])
+        read_s = time.perf_counter() - start
+        print(f"read : {read_s:8.2f} 秒  {len(remote_hashes) / read_s:12,.0f} 条/秒  ({len(ticker_map)} 个Ticker)")
+
+        updates = [
+            {'record_id': record_id, 'fields': {'Ticker': ticker, 'Current Price': 1.0 + i % 1000}}
+            for i, (ticker, record_id) in enumerate(ticker_map.items())
+        ]
+        writer = RecordBatchWriter(client, option, 'app_standin', 'tbl_standin',
+                                   chunk_size=args.batch_size, max_workers=args.max_workers)
+        start = time.perf_counter()
+        result = writer.update(updates)
+        write_s = time.perf_counter() - start
+        print(f"write: {write_s:8.2f} 秒  {result.success_count / write_s:12,.0f} 条/秒  "
+              f"(成功 {result.success_count}，失败 {result.fail_count}，"
+              f"请求 {result.request_count}，限流重试 {result.throttle_count})")
+
+        print(f"替身服务统计: {standin.stats()}")
+    return 0 if result.fail_count == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+本地飞书多维表格替身服务
+实现同步流程用到的开放平台接口，用于离线压测，不访问真实租户：
+- POST /open-apis/auth/v3/tenant_access_token/internal
+- GET  /open-apis/bitable/v1/apps/:app_token/tables/:table_id/fields
+- GET  /open-apis/bitable/v1/apps/:app_token/tables/:table_id/records      (page_size/page_token/field_names)
+- POST /open-apis/bitable/v1/apps/:app_token/tables/:table_id/records/batch_update
+- POST /open-apis/bitable/v1/apps/:app_token/tables/:table_id/records/batch_create
+- POST /open-apis/bitable/v1/apps/:app_token/tables/:table_id/records/batch_delete
+- GET  /stats                                                               各接口请求数和注入的限流次数
+
+可配置请求延迟、每秒请求数上限（超出返回HTTP 429 + 限流错误码）、随机限流比例和初始记录数
+
+用法:
+    python benchmarks/feishu_standin.py --port 8900 --records 10000 --latency 0.05 --rate-limit 50
+    FEISHU_DOMAIN=http://127.0.0.1:8900 FEISHU_USER_TOKEN=u-local python complete_sync.py
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from feishu_schema import FALLBACK_FIELD_TYPES  # noqa: E402
+
+MAX_BATCH_SIZE = 500
+MAX_PAGE_SIZE = 500
+CODE_RATE_LIMITED = 99991400
+CODE_BATCH_TOO_LARGE = 1254104
+CODE_RECORD_NOT_FOUND = 1254043
+CODE_INVALID_TOKEN = 99991663
+
+RECORDS_PATH = re.compile(r'^/open-apis/bitable/v1/apps/[^/]+/tables/[^/]+/records(?:/(batch_update|batch_create|batch_delete))?$')
+FIELDS_PATH = re.compile(r'^/open-apis/bitable/v1/apps/[^/]+/tables/[^/]+/fields$')
+TOKEN_PATH = '/open-apis/auth/v3/tenant_access_token/internal'
+
+
+def synthetic_fields(index: int) -> Dict[str, Any]:
+    """生成一条与自选表结构相同的记录"""
+    code = f"{index:06d}"
+    return {
+        'Ticker': f"{code}.{'SH' if index >= 600000 else 'SZ'}",
+        'Name': f"公司{index}",
+        'Sector|Theme': '算力/光模块',
+        'Current Price': 10.0 + index % 100,
+        'Target Low': 20,
+        'Target High': 30,
+        'Last Updated': '2025-01-01 00:00:00 CST',
+    }
+
+
+class BitableStore:
+    """内存中的单张数据表，所有app_token/table_id共用"""
+
+    def __init__(self, records: int = 0):
+        self._lock = threading.Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._next_id = 0
+        for i in range(records):
+            self._insert(synthetic_fields(i + 1))
+
+    def _insert(self, fields: Dict[str, Any]) -> str:
+        self._next_id += 1
+        record_id = f"rec{self._next_id:010d}"
+        self._records[record_id] = dict(fields)
+        return record_id
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def page(self, offset: int, size: int, field_names: Optional[List[str]]) -> Tuple[List[dict], bool]:
+        with self._lock:
+            ids = list(self._records)[offset:offset + size]
+            items = []
+            for record_id in ids:
+                fields = self._records[record_id]
+                if field_names:
+                    fields = {name: fields[name] for name in field_names if name in fields}
+                items.append({'record_id': record_id, 'fields': dict(fields)})
+            return items, offset + size < len(self._records)
+
+    def update(self, records: List[dict]) -> Optional[List[dict]]:
+        """全部record_id存在时更新并返回记录，否则返回None且不做修改"""
+        with self._lock:
+            if any(item.get('record_id') not in self._records for item in records):
+                return None
+            result = []
+            for item in records:
+                fields = self._records[item['record_id']]
+                fields.update(item.get('fields') or {})
+                result.append({'record_id': item['record_id'], 'fields': dict(fields)})
+            return result
+
+    def create(self, records: List[dict]) -> List[dict]:
+        with self._lock:
+            result = []
+            for item in records:
+                record_id = self._insert(item.get('fields') or {})
+                result.append({'record_id': record_id, 'fields': dict(self._records[record_id])})
+            return result
+
+    def delete(self, record_ids: List[str]) -> List[dict]:
+        with self._lock:
+            return [
+                {'record_id': record_id, 'deleted': self._records.pop(record_id, None) is not None}
+                for record_id in record_ids
+            ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: "_StandInHTTPServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload: dict, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode('utf-8'))
+
+    def _admit(self, endpoint: str) -> bool:
+        """记录请求、模拟延迟并按配置注入限流；返回False表示已回复限流错误"""
+        standin = self.server.standin
+        standin.count(endpoint)
+        if standin.latency or standin.jitter:
+            time.sleep(standin.latency + random.uniform(0, standin.jitter))
+        if standin.should_throttle():
+            standin.count('throttled')
+            self._send({'code': CODE_RATE_LIMITED, 'msg': 'request trigger frequency limit'},
+                       status=429, headers={'x-ogw-ratelimit-reset': str(standin.retry_after)})
+            return False
+        return True
+
+    def _authorized(self) -> bool:
+        if (self.headers.get('Authorization') or '').startswith('Bearer '):
+            return True
+        self._send({'code': CODE_INVALID_TOKEN, 'msg': 'Invalid access token for authorization'}, status=400)
+        return False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        standin = self.server.standin
+        if url.path == '/stats':
+            self._send(standin.stats())
+            return
+        if FIELDS_PATH.match(url.path):
+            if not self._admit('fields') or not self._authorized():
+                return
+            items = [{'field_id': f"fld{i}", 'field_name': name, 'type': field_type}
+                     for i, (name, field_type) in enumerate(FALLBACK_FIELD_TYPES.items())]
+            self._send({'code': 0, 'msg': 'success', 'data': {'items': items, 'has_more': False,
+                                                              'total': len(items)}})
+            return
+        match = RECORDS_PATH.match(url.path)
+        if not match or match.group(1):
+            self._send({'code': 404, 'msg': 'not found'}, status=404)
+            return
+        if not self._admit('list') or not self._authorized():
+            return
+
+        query = parse_qs(url.query)
+        size = min(int(query.get('page_size', ['20'])[0]), MAX_PAGE_SIZE)
+        offset = int(query.get('page_token', ['0'])[0] or 0)
+        field_names = json.loads(query['field_names'][0]) if 'field_names' in query else None
+        items, has_more = standin.store.page(offset, size, field_names)
+        data = {'items': items, 'has_more': has_more, 'total': len(standin.store)}
+        if has_more:
+            data['page_token'] = str(offset + size)
+        self._send({'code': 0, 'msg': 'success', 'data': data})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        standin = self.server.standin
+        # 先读完请求体，提前回复错误时长连接上不残留未读数据
+        payload = self._read_json()
+        if url.path == TOKEN_PATH:
+            if not self._admit('token'):
+                return
+            self._send({'code': 0, 'msg': 'ok', 'tenant_access_token': f"t-standin-{int(time.time())}",
+                        'expire': 7200})
+            return
+        match = RECORDS_PATH.match(url.path)
+        if not match or not match.group(1):
+            self._send({'code': 404, 'msg': 'not found'}, status=404)
+            return
+        action = match.group(1)
+        if not self._admit(action) or not self._authorized():
+            return
+
+        records = payload.get('records') or []
+        if len(records) > MAX_BATCH_SIZE:
+            self._send({'code': CODE_BATCH_TOO_LARGE, 'msg': f'records exceed {MAX_BATCH_SIZE}'})
+            return
+        if action == 'batch_update':
+            updated = standin.store.update(records)
+            if updated is None:
+                self._send({'code': CODE_RECORD_NOT_FOUND, 'msg': 'RecordIdNotFound'})
+                return
+            data = {'records': updated}
+        elif action == 'batch_create':
+            data = {'records': standin.store.create(records)}
+        else:
+            data = {'records': standin.store.delete(records)}
+        standin.count(f"{action}_records", len(records))
+        self._send({'code': 0, 'msg': 'success', 'data': data})
+
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    standin: "FeishuStandIn"
+
+
+class FeishuStandIn:
+    """飞书开放平台替身服务，可在进程内启动或作为独立进程运行"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, records: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, rate_limit: float = 0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示随机端口
+            records: 初始记录数
+            latency: 每个请求的固定延迟（秒）
+            jitter: 额外的随机延迟上限（秒）
+            rate_limit: 每秒请求数上限（滑动1秒窗口），超出返回429，0表示不限
+            throttle_rate: 随机返回限流错误的比例（0~1）
+            retry_after: 限流响应中x-ogw-ratelimit-reset给出的等待秒数
+        """
+        self.store = BitableStore(records)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._counters: Counter = Counter()
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._httpd = _StandInHTTPServer((host, port), _Handler)
+        self._httpd.standin = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def should_throttle(self) -> bool:
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            return True
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return True
+            self._recent.append(now)
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+        stats['records'] = len(self.store)
+        return stats
+
+    def start(self) -> "FeishuStandIn":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="feishu-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self) -> "FeishuStandIn":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="本地飞书多维表格替身服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--records', type=int, default=0, help="初始记录数")
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument('--rate-limit', type=float, default=0, help="每秒请求数上限，0表示不限")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="随机返回限流错误的比例")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="限流响应建议的等待秒数")
+    args = parser.parse_args()
+
+    standin = FeishuStandIn(args.host, args.port, records=args.records, latency=args.latency,
+                            jitter=args.jitter, rate_limit=args.rate_limit,
+                            throttle_rate=args.throttle_rate, retry_after=args.retry_after)
+    print(f"飞书替身服务已启动: {standin.url} ({len(standin.store)} 条记录)")
+    print(f"使用方式: FEISHU_DOMAIN={standin.url} FEISHU_USER_TOKEN=u-local python complete_sync.py")
+    try:
+        standin.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
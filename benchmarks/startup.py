@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准
+在独立的Python进程中用 -X importtime 导入各入口模块，汇总导入总耗时和最慢的模块
+
+用法:
+    python benchmarks/startup.py               # 默认入口模块 + 重依赖
+    python benchmarks/startup.py -n 3 --top 15 complete_sync
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 入口模块，以及入口模块按需才加载的重依赖（用于对比）
+DEFAULT_MODULES = ['complete_sync', 'sync_to_feishu', 'run_full_sync', 'pandas', 'akshare', 'lark_oapi']
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$')
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, int]]:
+    """
+    在新进程中导入模块
+
+    Returns:
+        (总耗时秒数, {顶层导入的模块名: 累计耗时微秒})
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    # 入口模块导入时会创建日志文件，在临时目录中运行
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=cwd, env=env, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+
+    cumulative: Dict[str, int] = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cum_us, indent, name = match.groups()
+        cumulative[name.strip()] = int(cum_us)
+        # 缩进为1个空格的是顶层导入，累加即为本次导入的总耗时
+        if len(indent) == 1:
+            total_us += int(cum_us)
+    return total_us / 1e6, cumulative
+
+
+def report(module: str, runs: List[Tuple[float, Dict[str, int]]], top: int):
+    totals = [total for total, _ in runs]
+    print(f"\n== {module} ==")
+    print(f"导入耗时: 中位数 {statistics.median(totals) * 1000:.1f} ms "
+          f"(最小 {min(totals) * 1000:.1f} ms, {len(totals)} 次)")
+    _, cumulative = min(runs, key=lambda run: run[0])
+    slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)
+    slowest = [(name, us) for name, us in slowest if name != module][:top]
+    for name, us in slowest:
+        print(f"  {us / 1000:9.1f} ms  {name}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="入口模块启动耗时基准 (-X importtime)")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help="要测量的模块")
+    parser.add_argument('-n', '--runs', type=int, default=3, help="每个模块重复测量次数")
+    parser.add_argument('--top', type=int, default=10, help="列出累计耗时最多的前N个导入")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            runs = [measure_import(module) for _ in range(max(1, args.runs))]
+        except RuntimeError as e:
+            print(f"\n== {module} ==\n{e}")
+            continue
+        report(module, runs, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,26 +5,48 @@
 直接调用函数，避免subprocess的网络问题
 """
 
-import akshare as ak
-import pandas as pd
-import numpy as np
-import requests
-import json
+from __future__ import annotations
+
 import time
 import os
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any, List
 import logging
 
+from pipeline import STATUS_OK, Step, run_pipeline
+from telemetry import log_call_summary, telemetry, write_report
+
+# akshare、pandas、lark_oapi等较重的依赖在步骤实际执行时才导入，
+# 只同步缓存数据的运行不会加载akshare
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 日志格式与日志文件
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FILE = 'complete_sync.log'
+
+
+def setup_logging(log_file: str = LOG_FILE):
+    """
+    配置根日志输出到控制台和log_file
+
+    根日志已被配置过时（如run_full_sync.py在导入本模块前已配置），只追加log_file的文件handler，
+    不会因basicConfig不再生效而丢失日志文件；同一文件只添加一次
+    """
+    root = logging.getLogger()
+    path = os.path.abspath(log_file)
+    if any(isinstance(handler, logging.FileHandler) and handler.baseFilename == path
+           for handler in root.handlers):
+        return
+    if not root.handlers:
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, handlers=[logging.StreamHandler()])
+    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(file_handler)
+
+
 # 设置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('complete_sync.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # 飞书应用配置
@@ -36,53 +58,65 @@ TABLE_ID = "tbl29O0osz3dn74L"
 # 文件路径配置
 EXCEL_FILE = 'fromyouwei.xlsx'
 UPDATED_EXCEL_FILE = 'fromyouwei_updated.xlsx'
-PRICE_DATA_FILE = 'data/all_stock_price.csv'
-EPS_DATA_FILE = 'data/股票代码_EPS.csv'
+# 是否导出处理后的Excel（与飞书同步并行写出，设为0则不导出）
+UPDATED_EXCEL_EXPORT = os.getenv('UPDATED_EXCEL_EXPORT', '1') == '1'
+PRICE_DATA_FILE = 'data/all_stock_price.parquet'
+EPS_DATA_FILE = 'data/股票代码_EPS.parquet'
+# 步骤3需要的价格列
+PRICE_COLUMNS = ['代码', '最新价', '总市值']
+# 是否同时导出CSV格式的快照（便于人工查看）
+SNAPSHOT_CSV_EXPORT = os.getenv('SNAPSHOT_CSV_EXPORT', '0') == '1'
 
+# 交易时段内价格快照的最长复用时间（秒），0表示交易时段内每次都重新获取
+PRICE_INTRADAY_MAX_AGE = float(os.getenv('PRICE_INTRADAY_MAX_AGE', '0'))
+
+# 行情来源配置：自选股超过QUOTE_PER_TICKER_MAX只时总是使用全市场快照，否则按实测延迟选择
+QUOTE_PER_TICKER_MAX = int(os.getenv('QUOTE_PER_TICKER_MAX', '50'))
+QUOTE_FETCH_RATE = float(os.getenv('QUOTE_FETCH_RATE', '5'))
+QUOTE_FETCH_MAX_IN_FLIGHT = int(os.getenv('QUOTE_FETCH_MAX_IN_FLIGHT', '8'))
+QUOTE_LATENCY_FILE = 'data/quote_latency.json'
+
+# EPS并发获取配置：每秒请求数、最大同时在途请求数
+EPS_FETCH_RATE = float(os.getenv('EPS_FETCH_RATE', '5'))
+EPS_FETCH_MAX_IN_FLIGHT = int(os.getenv('EPS_FETCH_MAX_IN_FLIGHT', '8'))
+# EPS/PE使用的预测年度（飞书字段名仍为 EPS (2025E)/PE (2025E)）
+EPS_YEAR = int(os.getenv('EPS_YEAR', '2025'))
+# EPS缓存有效期（小时），超过后重新获取该股票
+EPS_CACHE_TTL_HOURS = float(os.getenv('EPS_CACHE_TTL_HOURS', '24'))
+
+# 运行报告：JSON和Prometheus textfile，与日志文件放在同一目录
+RUN_REPORT_FILE = os.getenv('RUN_REPORT_FILE', 'complete_sync_metrics.json')
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', 'complete_sync.prom')
+
+# --profile 模式的剖析文件目录（每次运行一个以时间命名的子目录）
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+# 常驻模式：交易时段内的同步间隔（秒）；Ticker映射缺少记录时，距上次获取超过该时间（秒）才重新获取
+DAEMON_INTERVAL = float(os.getenv('DAEMON_INTERVAL', '30'))
+TICKER_MAP_REFRESH_SECONDS = float(os.getenv('TICKER_MAP_REFRESH_SECONDS', '600'))
+
+# 飞书访问身份: user（FEISHU_USER_TOKEN） / tenant（应用身份，tenant_access_token由feishu_auth获取、缓存和刷新）
+FEISHU_AUTH_MODE = os.getenv('FEISHU_AUTH_MODE', 'user')
+
+# 飞书批量写入配置
+SYNC_BATCH_SIZE = int(os.getenv('FEISHU_SYNC_BATCH_SIZE', '500'))
+SYNC_MAX_WORKERS = int(os.getenv('FEISHU_SYNC_MAX_WORKERS', '8'))
+
+# 变更检测配置: auto / hash / remote / off
+SYNC_DIFF_MODE = os.getenv('FEISHU_SYNC_DIFF_MODE', 'auto')
+SYNC_STATE_FILE = 'data/feishu_sync_state.json'
+
+# 飞书字段结构缓存
+SCHEMA_CACHE_FILE = 'data/feishu_schema.json'
+SCHEMA_CACHE_TTL_HOURS = float(os.getenv('FEISHU_SCHEMA_TTL_HOURS', '24'))
 
-class FeishuAuth:
-    """飞书API认证类，负责token获取和管理"""
-    
-    def __init__(self, app_id: str = None, app_secret: str = None):
-        self.app_id = app_id or APP_ID
-        self.app_secret = app_secret or APP_SECRET
-        self.tenant_access_token: Optional[str] = None
-        self.token_expires_at: int = 0
-        self.base_url = "https://open.feishu.cn/open-apis"
-        
-    def get_tenant_access_token(self, force_refresh: bool = False) -> str:
-        """获取tenant_access_token"""
-        current_time = int(time.time())
-        if (not force_refresh and 
-            self.tenant_access_token and 
-            current_time < self.token_expires_at - 300):
-            return self.tenant_access_token
-            
-        url = f"{self.base_url}/auth/v3/tenant_access_token/internal"
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-        headers = {'Content-Type': 'application/json'}
-        
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            
-            result = response.json()
-            if result.get("code") != 0:
-                raise Exception(f"获取token失败: {result.get('msg', 'Unknown error')}")
-            
-            self.tenant_access_token = result["tenant_access_token"]
-            expires_in = result.get("expire", 7200)
-            self.token_expires_at = current_time + expires_in
-            
-            logger.info(f"✅ 成功获取token，有效期: {expires_in}秒")
-            return self.tenant_access_token
-            
-        except Exception as e:
-            logger.error(f"❌ 获取token失败: {str(e)}")
-            raise
+
+def akshare_fetch(name, **kwargs):
+    """调用ak.<name>(**kwargs)，记录用时和错误"""
+    from get_data.akshare_replay import akshare_call
+
+    with telemetry.track(f'akshare.{name}'):
+        return akshare_call(name, **kwargs)
 
 
 def get_stock_price_data_with_retry(max_retries=3, delay=2):
@@ -90,13 +124,14 @@ def get_stock_price_data_with_retry(max_retries=3, delay=2):
     for attempt in range(max_retries):
         try:
             logger.info(f"尝试获取股票数据 (第{attempt + 1}/{max_retries}次)...")
-            stock_df = ak.stock_zh_a_spot_em()
+            stock_df = akshare_fetch('stock_zh_a_spot_em')
             logger.info(f"成功获取{len(stock_df)}条股票数据")
             return stock_df
         
         except Exception as e:
             logger.error(f"第{attempt + 1}次获取失败: {str(e)}")
             if attempt < max_retries - 1:
+                telemetry.record_retry('akshare.stock_zh_a_spot_em')
                 logger.info(f"等待{delay}秒后重试...")
                 time.sleep(delay)
                 delay *= 2
@@ -105,46 +140,118 @@ def get_stock_price_data_with_retry(max_retries=3, delay=2):
                 raise e
 
 
-def get_eps_data_with_retry(stock_code, max_retries=3, delay=1):
-    """带重试机制的EPS数据获取"""
+def get_quote_with_retry(stock_code, max_retries=3, delay=1, rate_limiter=None):
+    """带重试机制的单只股票行情获取，返回 {'代码','名称','最新价','总市值'}，失败返回None"""
+    import pandas as pd
+    
     for attempt in range(max_retries):
         try:
-            stock_df = ak.stock_profit_forecast_ths(symbol=stock_code, indicator="预测年报每股收益")
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            info_df = akshare_fetch('stock_individual_info_em', symbol=stock_code)
+            info = dict(zip(info_df['item'], info_df['value']))
+            return {
+                '代码': stock_code,
+                '名称': info.get('股票简称'),
+                '最新价': pd.to_numeric(info.get('最新'), errors='coerce'),
+                '总市值': pd.to_numeric(info.get('总市值'), errors='coerce'),
+            }
+        
+        except Exception as e:
+            logger.warning(f"股票 {stock_code} 行情第{attempt + 1}次获取失败: {str(e)}")
+            if attempt < max_retries - 1:
+                telemetry.record_retry('akshare.stock_individual_info_em')
+                time.sleep(delay)
+                delay *= 1.5
+            else:
+                logger.warning(f"股票 {stock_code} 行情所有重试都失败了")
+                return None
+
+
+def get_eps_data_with_retry(stock_code, max_retries=3, delay=1, rate_limiter=None):
+    """带重试机制的EPS数据获取，rate_limiter用于在每次请求前限速；全部重试失败时返回None"""
+    for attempt in range(max_retries):
+        try:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            stock_df = akshare_fetch('stock_profit_forecast_ths', symbol=stock_code, indicator="预测年报每股收益")
             stock_df['股票代码'] = stock_code
             return stock_df
         
         except Exception as e:
             logger.warning(f"股票 {stock_code} 第{attempt + 1}次获取失败: {str(e)}")
             if attempt < max_retries - 1:
+                telemetry.record_retry('akshare.stock_profit_forecast_ths')
                 time.sleep(delay)
                 delay *= 1.5
             else:
                 logger.warning(f"股票 {stock_code} 所有重试都失败了")
-                return pd.DataFrame()
+                return None
 
 
 def step1_get_stock_price():
-    """步骤1: 获取股票价格数据"""
+    """
+    步骤1: 获取股票价格数据
+
+    Returns:
+        pd.DataFrame: 自选股价格数据（代码/最新价/总市值），失败返回False
+    """
     logger.info("=" * 50)
     logger.info("步骤1: 获取股票价格数据")
     logger.info("=" * 50)
     
-    # 检查是否已有数据文件
-    if os.path.exists(PRICE_DATA_FILE):
-        logger.info(f"✅ 发现已存在的价格数据文件: {PRICE_DATA_FILE}")
+    from get_data.price_cache import PriceSnapshotCache
+    from get_data.quote_provider import QuoteProvider
+    from get_data.snapshot_io import read_snapshot, write_snapshot
+    from get_data.watchlist import load_watchlist_codes
+    
+    # 需要价格的股票：自选股列表
+    try:
+        codes = load_watchlist_codes(EXCEL_FILE)
+        logger.info(f"📋 自选股: {len(codes)} 只")
+    except Exception as e:
+        logger.error(f"❌ 读取自选股列表失败: {str(e)}")
+        return False
+    
+    # 检查价格快照是否仍然有效（交易时段内过期，收盘后到下次开盘前有效），且包含全部自选股
+    price_cache = PriceSnapshotCache(PRICE_DATA_FILE, intraday_max_age=PRICE_INTRADAY_MAX_AGE)
+    missing = price_cache.missing_codes(codes)
+    if price_cache.is_fresh() and not missing:
+        logger.info(f"✅ 价格快照仍然有效 ({price_cache.describe()})，使用现有数据: {PRICE_DATA_FILE}")
         try:
-            df_check = pd.read_csv(PRICE_DATA_FILE)
-            logger.info(f"✅ 使用现有价格数据 ({len(df_check)} 条记录)")
-            return True
+            return read_snapshot(PRICE_DATA_FILE, columns=PRICE_COLUMNS)
         except Exception as e:
-            logger.warning(f"⚠️ 现有数据文件损坏，重新获取: {e}")
+            logger.warning(f"⚠️ 读取价格快照失败，重新获取: {str(e)}")
+    if os.path.exists(PRICE_DATA_FILE):
+        if missing:
+            logger.info(f"♻️ 价格快照缺少 {len(missing)} 只自选股，重新获取")
+        else:
+            logger.info(f"♻️ 价格快照已过期 ({price_cache.describe()})，重新获取")
     
     try:
         os.makedirs('data', exist_ok=True)
-        stock_zh_a_spot_em_df = get_stock_price_data_with_retry()
-        stock_zh_a_spot_em_df.to_csv(PRICE_DATA_FILE, index=False)
-        logger.info(f"✅ 股票价格数据已保存到: {PRICE_DATA_FILE}")
-        return True
+        
+        # 按自选股数量和实测延迟选择逐只获取或全市场快照
+        provider = QuoteProvider(
+            per_ticker_fn=get_quote_with_retry,
+            snapshot_fn=get_stock_price_data_with_retry,
+            max_per_ticker=QUOTE_PER_TICKER_MAX,
+            rate=QUOTE_FETCH_RATE,
+            max_in_flight=QUOTE_FETCH_MAX_IN_FLIGHT,
+            stats_path=QUOTE_LATENCY_FILE
+        )
+        quote_df = provider.fetch(codes)
+        
+        not_found = sorted(set(codes) - set(quote_df['代码']))
+        if not_found:
+            logger.warning(f"⚠️ 行情中未找到: {', '.join(not_found)}")
+        
+        write_snapshot(quote_df, PRICE_DATA_FILE, csv_export=SNAPSHOT_CSV_EXPORT)
+        # 补齐失败的股票不计入快照范围，下次运行时重新获取
+        unresolved = set(provider.unresolved)
+        price_cache.mark_fetched(codes=[code for code in codes if code not in unresolved])
+        logger.info(f"✅ 股票价格数据已保存到: {PRICE_DATA_FILE} ({len(quote_df)} 条)")
+        return quote_df[PRICE_COLUMNS]
         
     except Exception as e:
         logger.error(f"❌ 获取股票价格数据失败: {str(e)}")
@@ -152,311 +259,343 @@ def step1_get_stock_price():
 
 
 def step2_get_eps_data():
-    """步骤2: 获取EPS数据"""
+    """
+    步骤2: 获取EPS数据
+
+    Returns:
+        pd.DataFrame: 全部EPS预测数据，失败返回False
+    """
     logger.info("=" * 50)
     logger.info("步骤2: 获取EPS预测数据")
     logger.info("=" * 50)
     
-    # 检查是否已有EPS数据文件
-    if os.path.exists(EPS_DATA_FILE):
-        logger.info(f"✅ 发现已存在的EPS数据文件: {EPS_DATA_FILE}")
-        try:
-            df_check = pd.read_csv(EPS_DATA_FILE)
-            logger.info(f"✅ 使用现有EPS数据 ({len(df_check)} 条记录)")
-            return True
-        except Exception as e:
-            logger.warning(f"⚠️ 现有EPS数据文件损坏，重新获取: {e}")
+    from get_data.concurrent_fetch import TokenBucket, fetch_concurrently
+    from get_data.eps_store import EpsStore
+    from get_data.watchlist import load_watchlist_codes
+    
+    # 需要EPS的股票：自选股列表
+    try:
+        stock_list = load_watchlist_codes(EXCEL_FILE)
+        logger.info(f"📋 自选股: {len(stock_list)} 只")
+    except Exception as e:
+        logger.error(f"❌ 读取自选股列表失败: {str(e)}")
+        return False
     
-    stock_list = ['002156', '002837', '300229', '600249', '002230', '688111', '603019', '300496', '600519']
+    # 只获取缺失或超过有效期的股票
+    store = EpsStore(EPS_DATA_FILE, ttl_seconds=EPS_CACHE_TTL_HOURS * 3600).load()
+    stale_list = store.stale_codes(stock_list)
+    logger.info(f"📦 EPS缓存: {len(stock_list) - len(stale_list)} 只股票有效，{len(stale_list)} 只需要获取 (有效期 {EPS_CACHE_TTL_HOURS} 小时)")
     
-    all_stocks_esp_df = pd.DataFrame()
-    successful_count = 0
+    if not stale_list:
+        logger.info(f"✅ 使用现有EPS数据 ({len(store.df)} 条记录)")
+        return store.df
     
-    for i, stock_code in enumerate(stock_list):
-        logger.info(f"正在处理股票 {stock_code} ({i+1}/{len(stock_list)})...")
-        
-        try:
-            stock_data = get_eps_data_with_retry(stock_code)
-            
-            if not stock_data.empty:
-                all_stocks_esp_df = pd.concat([all_stocks_esp_df, stock_data], ignore_index=True)
-                successful_count += 1
-                logger.info(f"✅ 成功获取股票 {stock_code} 的预测每股收益数据")
-            else:
-                logger.warning(f"⚠️ 股票 {stock_code} 数据获取失败，跳过")
-            
-            time.sleep(0.5)
-            
-        except Exception as e:
-            logger.error(f"❌ 获取股票 {stock_code} 数据时出现异常: {e}")
+    # 令牌桶限速 + 有界线程池并发获取
+    logger.info(f"并发获取 {len(stale_list)} 只股票的EPS数据 (限速 {EPS_FETCH_RATE}次/秒, 并发 {EPS_FETCH_MAX_IN_FLIGHT})")
+    limiter = TokenBucket(EPS_FETCH_RATE)
+    results = fetch_concurrently(
+        stale_list,
+        lambda stock_code: get_eps_data_with_retry(stock_code, rate_limiter=limiter),
+        max_workers=EPS_FETCH_MAX_IN_FLIGHT,
+        description="EPS"
+    )
     
-    if not all_stocks_esp_df.empty:
-        all_stocks_esp_df.to_csv(EPS_DATA_FILE, index=False, encoding='utf-8-sig')
-        logger.info(f"✅ EPS数据已保存到: {EPS_DATA_FILE}")
-        logger.info(f"📊 共处理了 {len(stock_list)} 只股票，成功获取 {successful_count} 只股票的数据，总计 {len(all_stocks_esp_df)} 条记录")
-        return True
+    for stock_code, stock_data in results.items():
+        if stock_data is not None and not stock_data.empty:
+            logger.info(f"✅ 成功获取股票 {stock_code} 的预测每股收益数据")
+        elif stock_data is not None:
+            logger.info(f"ℹ️ 股票 {stock_code} 没有预测数据，{EPS_CACHE_TTL_HOURS} 小时内不再获取")
+        elif stock_code in store.codes:
+            logger.warning(f"⚠️ 股票 {stock_code} 数据获取失败，继续使用过期数据")
+        else:
+            logger.warning(f"⚠️ 股票 {stock_code} 数据获取失败，跳过")
+    
+    successful_count = store.merge(results)
+    empty_count = sum(1 for stock_data in results.values() if stock_data is not None and stock_data.empty)
+    if successful_count or empty_count:
+        store.save(csv_export=SNAPSHOT_CSV_EXPORT)
+    
+    if not store.df.empty:
+        if successful_count:
+            logger.info(f"✅ EPS数据已保存到: {EPS_DATA_FILE}")
+        logger.info(f"📊 共需获取 {len(stale_list)} 只股票，成功获取 {successful_count} 只股票的数据，总计 {len(store.df)} 条记录")
+        return store.df
     else:
         logger.error("❌ 没有获取到任何EPS数据")
         return False
 
 
-def step3_process_excel_data():
-    """步骤3: 处理Excel数据"""
+def step3_process_excel_data(df_price: Optional[pd.DataFrame] = None, df_eps: Optional[pd.DataFrame] = None):
+    """
+    步骤3: 处理Excel数据
+
+    Args:
+        df_price: 步骤1的价格数据，None表示从价格快照文件读取
+        df_eps: 步骤2的EPS数据，None表示从EPS文件读取
+
+    Returns:
+        pd.DataFrame: 计算指标后的自选表，失败返回False
+    """
     logger.info("=" * 50)
     logger.info("步骤3: 处理Excel数据，计算财务指标")
     logger.info("=" * 50)
     
+    from get_data.snapshot_io import read_snapshot
+    from get_data.watchlist import read_watchlist
+    from stock_metrics import compute_metrics, select_eps_year
+    
     try:
         # 读取Excel文件
-        df_excel = pd.read_excel(EXCEL_FILE)
+        df_excel = read_watchlist(EXCEL_FILE)
         logger.info(f"读取Excel文件: {len(df_excel)} 行数据")
         
-        # 读取股票价格数据
-        df_price = pd.read_csv(PRICE_DATA_FILE)
-        df_price['代码'] = df_price['代码'].astype(str).str.zfill(6)
+        # 读取股票价格数据（只加载需要的列）
+        if df_price is None:
+            df_price = read_snapshot(PRICE_DATA_FILE, columns=PRICE_COLUMNS)
         
         # 读取EPS数据
-        df_eps = pd.read_csv(EPS_DATA_FILE)
-        df_eps_2025 = df_eps[df_eps['年度'] == 2025].copy()
-        df_eps_2025['股票代码'] = df_eps_2025['股票代码'].astype(str).str.zfill(6)
-        
-        # 创建查找字典
-        price_dict = dict(zip(df_price['代码'], df_price['最新价']))
-        market_cap_dict = dict(zip(df_price['代码'], df_price['总市值']))
-        eps_dict = dict(zip(df_eps_2025['股票代码'], df_eps_2025['均值']))
-        
-        # 处理每一行
-        def process_row(row):
-            ticker = str(row['Ticker'])[:6]
-            
-            # 获取数据
-            current_price = price_dict.get(ticker, np.nan)
-            eps_mean = eps_dict.get(ticker, np.nan)
-            
-            # 计算指标
-            pe_2025e = current_price / eps_mean if eps_mean and eps_mean != 0 and not np.isnan(eps_mean) else np.nan
-            market_cap = market_cap_dict.get(ticker, np.nan)
-            market_cap_bn = market_cap / 100000000 if not np.isnan(market_cap) else np.nan
-            
-            target_low = row['Target Low']
-            target_high = row['Target High']
-            mid_target = (target_low + target_high) / 2 if not np.isnan(target_low) and not np.isnan(target_high) else np.nan
-            potential_upside = round((mid_target / current_price - 1) * 100, 1) if not np.isnan(current_price) and not np.isnan(mid_target) and current_price != 0 else np.nan
-            
-            # 更新行数据
-            row['Current Price'] = current_price
-            row['EPS (2025E)'] = eps_mean
-            row['PE (2025E)'] = pe_2025e
-            row['Market Cap (CNY bn)'] = market_cap_bn
-            row['Mid Target'] = mid_target
-            row['Potential Upside %'] = potential_upside
-            # 添加Last Updated字段 - 使用北京时间
-            from datetime import timezone, timedelta
-            beijing_tz = timezone(timedelta(hours=8))
-            beijing_time = datetime.now(beijing_tz)
-            row['Last Updated'] = beijing_time.strftime('%Y-%m-%d %H:%M:%S CST')
-            
-            return row
-        
-        # 应用处理函数
-        df_excel = df_excel.apply(process_row, axis=1)
-        
-        # 保存更新后的Excel文件
-        df_excel.to_excel(UPDATED_EXCEL_FILE, index=False)
-        logger.info(f"✅ Excel文件已成功更新并保存到: {UPDATED_EXCEL_FILE}")
+        if df_eps is None:
+            df_eps = read_snapshot(EPS_DATA_FILE, columns=['年度', '均值', '股票代码'])
+        df_eps_2025 = select_eps_year(df_eps, EPS_YEAR)
+        
+        # 按股票代码连接价格与EPS数据，向量化计算指标
+        # Last Updated字段 - 使用北京时间，整批数据共用同一时间
+        from datetime import timezone, timedelta
+        beijing_tz = timezone(timedelta(hours=8))
+        beijing_time = datetime.now(beijing_tz)
+        df_excel = compute_metrics(df_excel, df_price, df_eps_2025,
+                                   updated_at=beijing_time.strftime('%Y-%m-%d %H:%M:%S CST'))
+        
         logger.info(f"处理了 {len(df_excel)} 行数据")
-        return True
+        return df_excel
         
     except Exception as e:
         logger.error(f"❌ 处理Excel数据失败: {str(e)}")
         return False
 
 
-def step4_sync_to_feishu():
-    """步骤4: 同步到飞书"""
+def export_updated_excel(df: pd.DataFrame):
+    """
+    导出处理后的Excel（旁路输出，与飞书同步并行执行）
+
+    导出失败只记录警告，不影响流程结果
+    """
+    try:
+        df.to_excel(UPDATED_EXCEL_FILE, index=False)
+        logger.info(f"✅ Excel文件已成功更新并保存到: {UPDATED_EXCEL_FILE}")
+    except Exception as e:
+        logger.warning(f"⚠️ 导出Excel失败: {str(e)}")
+    return True
+
+
+class FeishuTableSync:
+    """
+    飞书数据表同步会话
+
+    持有客户端、字段转换表、Ticker -> record_id 映射和变更检测基线，可多次调用push；
+    单次运行中push一次，常驻模式下保留在内存中，之后每轮只推送内容变化的记录
+    """
+
+    def __init__(self, user_access_token: Optional[str] = None):
+        """
+        Args:
+            user_access_token: 飞书用户访问凭证，None表示以应用身份访问（tenant_access_token）
+
+        Raises:
+            ImportError: 缺少lark_oapi依赖时
+        """
+        import lark_oapi as lark
+        from feishu_auth import FeishuAuth
+        from feishu_http import get_lark_client
+        from feishu_schema import load_field_coercer
+        import sync_state
+        
+        self.sync_state = sync_state
+        self.app_token = BASE_URL.split('/')[-1]
+        self.table_id = TABLE_ID
+        
+        logger.info("🔗 创建飞书客户端")
+        self.client = get_lark_client(APP_ID, APP_SECRET)
+        self._lark = lark
+        self._user_option = None
+        self._tenant_option = (None, None)
+        self.auth: Optional[FeishuAuth] = None
+        if user_access_token:
+            self._user_option = lark.RequestOption.builder().user_access_token(user_access_token).build()
+        else:
+            # 应用身份：token在内存中复用，跨进程共享缓存，失效前刷新
+            self.auth = FeishuAuth(APP_ID, APP_SECRET)
+            logger.info("🔑 使用应用身份 (tenant_access_token) 访问飞书")
+        
+        # 按飞书字段结构编译转换表，按列完成字段名映射和类型转换
+        self.coercer = load_field_coercer(self.client, self.option, self.app_token, self.table_id,
+                                          cache_path=SCHEMA_CACHE_FILE,
+                                          ttl_seconds=SCHEMA_CACHE_TTL_HOURS * 3600)
+        
+        # 变更检测：有本地状态时比较内容哈希，否则读取飞书当前值比较
+        self.state_store = sync_state.SyncStateStore(SYNC_STATE_FILE, f"{self.app_token}/{self.table_id}").load()
+        self.diff_mode = SYNC_DIFF_MODE
+        if self.diff_mode == sync_state.DIFF_MODE_AUTO:
+            self.diff_mode = sync_state.DIFF_MODE_HASH if self.state_store.loaded else sync_state.DIFF_MODE_REMOTE
+        logger.info(f"🔍 变更检测模式: {self.diff_mode}")
+        
+        self.ticker_map: Optional[Dict[str, str]] = None
+        self.ticker_map_loaded_at = 0.0
+    
+    @property
+    def option(self):
+        """请求选项；应用身份下token更新后重新构建"""
+        if self.auth is None:
+            return self._user_option
+        token = self.auth.get_tenant_access_token()
+        if self._tenant_option[0] != token:
+            self._tenant_option = (token, self._lark.RequestOption.builder().tenant_access_token(token).build())
+        return self._tenant_option[1]
+    
+    def start_token_refresh(self):
+        """应用身份下启动后台线程，在tenant_access_token失效前刷新"""
+        if self.auth is not None:
+            self.auth.start_background_refresh()
+    
+    def close(self):
+        if self.auth is not None:
+            self.auth.stop_background_refresh()
+    
+    def load_ticker_map(self, compare_fields: Optional[List[str]] = None):
+        """
+        获取现有记录（分页流式读取，只请求需要的字段），构建Ticker映射；
+        远端比对模式下同时读取飞书当前内容哈希作为变更检测的起点
+        """
+        logger.info("📋 获取现有飞书记录")
+        if self.diff_mode == self.sync_state.DIFF_MODE_REMOTE and compare_fields:
+            self.ticker_map, remote_hashes = self.sync_state.load_remote_state(
+                self.client, self.option, self.app_token, self.table_id, compare_fields)
+            self.state_store.hashes.update(remote_hashes)
+        else:
+            from feishu_records import build_ticker_map
+            self.ticker_map = build_ticker_map(self.client, self.option, self.app_token, self.table_id)
+        self.ticker_map_loaded_at = time.monotonic()
+        logger.info(f"🗂️ 创建映射: {len(self.ticker_map)} 条")
+    
+    def _match_records(self, fixed_records: List[Dict[str, Any]]):
+        """按Ticker组装待更新记录，返回 (待更新记录, 飞书表格中不存在的Ticker)"""
+        updates = []
+        missing = []
+        for record in fixed_records:
+            fixed_fields = record['fields']
+            ticker = fixed_fields.get('Ticker', '')
+            if ticker in self.ticker_map:
+                updates.append({'record_id': self.ticker_map[ticker], 'fields': fixed_fields})
+            else:
+                missing.append(ticker)
+        return updates, missing
+    
+    def push(self, df: pd.DataFrame) -> bool:
+        """
+        推送计算后的自选表，跳过内容未变化的记录
+
+        Returns:
+            bool: 是否成功
+        """
+        from feishu_records import RecordBatchWriter, log_write_result
+        
+        fixed_records = self.coercer.records_from_dataframe(df)
+        logger.info(f"📝 处理了 {len(fixed_records)} 条记录")
+        
+        if self.ticker_map is None:
+            try:
+                self.load_ticker_map(list(fixed_records[0]['fields'].keys()) if fixed_records else None)
+            except Exception as e:
+                logger.error(f"❌ {e}")
+                return False
+        
+        updates, missing = self._match_records(fixed_records)
+        # 常驻模式下飞书表格可能新增了记录，映射足够旧时重新获取
+        if missing and time.monotonic() - self.ticker_map_loaded_at > TICKER_MAP_REFRESH_SECONDS:
+            logger.info(f"♻️ {len(missing)} 个Ticker不在映射中，重新获取飞书记录映射")
+            try:
+                self.load_ticker_map()
+                updates, missing = self._match_records(fixed_records)
+            except Exception as e:
+                logger.warning(f"⚠️ 重新获取飞书记录映射失败，沿用现有映射: {e}")
+        for ticker in missing:
+            logger.warning(f"  ⚠️ 跳过: Ticker {ticker} 在飞书表格中不存在")
+        
+        # 跳过内容未变化的记录
+        unchanged_count = 0
+        if self.diff_mode != self.sync_state.DIFF_MODE_OFF:
+            updates_to_push, unchanged_count = self.sync_state.filter_changed(updates, self.state_store.hashes)
+            logger.info(f"⏭️ 内容未变化: {unchanged_count} 条，避免了 {unchanged_count} 次记录写入")
+        else:
+            updates_to_push = updates
+        
+        # 批量更新记录
+        logger.info(f"🔄 开始批量更新 {len(updates_to_push)} 条记录")
+        writer = RecordBatchWriter(self.client, self.option, self.app_token, self.table_id,
+                                   chunk_size=SYNC_BATCH_SIZE, max_workers=SYNC_MAX_WORKERS)
+        result = writer.update(updates_to_push)
+        
+        # 保存本次推送内容哈希，供下次比较
+        if self.diff_mode != self.sync_state.DIFF_MODE_OFF:
+            self.state_store.mark_pushed(updates_to_push, result.succeeded)
+            try:
+                self.state_store.save()
+            except Exception as e:
+                logger.warning(f"⚠️ 保存同步状态失败: {e}")
+        
+        # 结果报告
+        logger.info("🎉 飞书同步完成!")
+        log_write_result(result, len(fixed_records))
+        logger.info(f"⏭️ 未变化: {unchanged_count} 条")
+        logger.info(f"⚠️ 跳过: {len(missing)} 条")
+        
+        return result.success_count > 0 or (result.fail_count == 0 and unchanged_count > 0)
+
+
+def feishu_sync_enabled() -> bool:
+    """是否配置了飞书访问身份"""
+    return FEISHU_AUTH_MODE == 'tenant' or bool(os.getenv('FEISHU_USER_TOKEN'))
+
+
+def create_feishu_session() -> FeishuTableSync:
+    """按FEISHU_AUTH_MODE创建飞书同步会话"""
+    if FEISHU_AUTH_MODE == 'tenant':
+        return FeishuTableSync()
+    return FeishuTableSync(os.getenv('FEISHU_USER_TOKEN'))
+
+
+def step4_sync_to_feishu(df: Optional[pd.DataFrame] = None):
+    """
+    步骤4: 同步到飞书
+
+    Args:
+        df: 步骤3计算后的自选表，None表示从导出的Excel读取
+    """
     logger.info("=" * 50)
     logger.info("步骤4: 同步数据到飞书")
     logger.info("=" * 50)
     
     try:
-        # 检查是否有user_access_token环境变量
-        user_access_token = os.getenv('FEISHU_USER_TOKEN')
-        if not user_access_token:
+        # 检查是否有user_access_token环境变量或启用了应用身份
+        if not feishu_sync_enabled():
             logger.warning("⚠️ 未设置FEISHU_USER_TOKEN环境变量，跳过飞书同步")
-            logger.info("💡 要启用飞书同步，请设置环境变量: export FEISHU_USER_TOKEN=your_token")
+            logger.info("💡 要启用飞书同步，请设置环境变量: export FEISHU_USER_TOKEN=your_token"
+                        "（或 FEISHU_AUTH_MODE=tenant 以应用身份同步）")
             return True
         
-        # 导入飞书API
         try:
-            import lark_oapi as lark
-            from lark_oapi.api.bitable.v1 import (
-                ListAppTableRecordRequest, BatchUpdateAppTableRecordRequest,
-                BatchUpdateAppTableRecordRequestBody, AppTableRecord
-            )
+            session = create_feishu_session()
         except ImportError:
             logger.error("❌ 缺少lark_oapi依赖，请运行: pip install lark_oapi")
             return False
         
-        # 读取处理后的Excel数据
-        df = pd.read_excel(UPDATED_EXCEL_FILE)
-        logger.info(f"读取更新后的Excel数据: {len(df)} 行")
+        # 读取处理后的数据
+        if df is None:
+            import pandas as pd
+            df = pd.read_excel(UPDATED_EXCEL_FILE)
+            logger.info(f"读取更新后的Excel数据: {len(df)} 行")
         
-        # 飞书配置
-        app_token = BASE_URL.split('/')[-1]
-        table_id = TABLE_ID
-        
-        logger.info("🔗 创建飞书客户端")
-        client = lark.Client.builder() \
-            .app_id(APP_ID) \
-            .app_secret(APP_SECRET) \
-            .enable_set_token(True) \
-            .log_level(lark.LogLevel.INFO) \
-            .build()
-        
-        option = lark.RequestOption.builder().user_access_token(user_access_token).build()
-        
-        # 数据处理函数
-        def fix_field_mapping(excel_fields):
-            """修复字段映射和数据类型"""
-            fixed_fields = {}
-            
-            field_mapping = {
-                'Sector/Theme': 'Sector|Theme',
-                'Source / Link': 'Source | Link',
-            }
-            
-            number_fields = {
-                'Current Price', 'Market Cap (CNY bn)', 'Safe Buy Low', 'Safe Buy High', 
-                'Extreme Safe', 'Target Low', 'Target High', 'Mid Target', 
-                'Potential Upside %', 'Stop Loss'
-            }
-            
-            text_fields = {
-                'Ticker', 'Name', 'Sector|Theme', 'PE (2025E)', 'EPS (2025E)', 
-                'Source | Link', 'Notes', 'Last Updated'
-            }
-            
-            for field_name, value in excel_fields.items():
-                feishu_field_name = field_mapping.get(field_name, field_name)
-                
-                if value is None or (isinstance(value, float) and str(value).lower() == 'nan'):
-                    if feishu_field_name in number_fields:
-                        fixed_value = 0
-                    else:
-                        fixed_value = ""
-                elif feishu_field_name in number_fields:
-                    try:
-                        if isinstance(value, str):
-                            fixed_value = float(value) if '.' in value else int(value)
-                        else:
-                            fixed_value = float(value)
-                    except (ValueError, TypeError):
-                        fixed_value = 0
-                elif feishu_field_name in text_fields:
-                    fixed_value = str(value)
-                else:
-                    fixed_value = str(value)
-                
-                fixed_fields[feishu_field_name] = fixed_value
-            
-            return fixed_fields
-        
-        # 转换Excel数据为飞书格式
-        excel_records = []
-        for _, row in df.iterrows():
-            fields = {}
-            for col in df.columns:
-                value = row[col]
-                # 处理NaN和None值
-                if pd.isna(value) or value is None:
-                    fields[col] = ""
-                elif isinstance(value, float) and str(value).lower() == 'nan':
-                    fields[col] = ""
-                else:
-                    fields[col] = value
-            excel_records.append({'fields': fields})
-        
-        # 修复字段映射
-        fixed_records = []
-        for record in excel_records:
-            original_fields = record.get('fields', {})
-            fixed_fields = fix_field_mapping(original_fields)
-            fixed_records.append({'fields': fixed_fields})
-        
-        logger.info(f"📝 处理了 {len(fixed_records)} 条记录")
-        
-        # 获取现有记录
-        logger.info("📋 获取现有飞书记录")
-        list_request = ListAppTableRecordRequest.builder() \
-            .app_token(app_token) \
-            .table_id(table_id) \
-            .page_size(500) \
-            .build()
-            
-        list_response = client.bitable.v1.app_table_record.list(list_request, option)
-        
-        if not list_response.success():
-            logger.error(f"❌ 获取飞书记录失败: {list_response.code}, {list_response.msg}")
-            return False
-            
-        existing_records = list_response.data.items or []
-        logger.info(f"📋 获取到飞书记录: {len(existing_records)} 条")
-        
-        # 创建映射
-        existing_map = {}
-        for record in existing_records:
-            ticker = record.fields.get('Ticker')
-            if ticker:
-                existing_map[str(ticker)] = record.record_id
-        
-        logger.info(f"🗂️ 创建映射: {len(existing_map)} 条")
-        
-        # 更新记录
-        logger.info("🔄 开始更新记录")
-        success_count = 0
-        fail_count = 0
-        
-        for i, record in enumerate(fixed_records, 1):
-            fixed_fields = record['fields']
-            ticker = fixed_fields.get('Ticker', '')
-            name = fixed_fields.get('Name', '未知')
-            
-            logger.info(f"处理 {i}/{len(fixed_records)}: {ticker} ({name})")
-            
-            if ticker in existing_map:
-                record_id = existing_map[ticker]
-                
-                update_request = BatchUpdateAppTableRecordRequest.builder() \
-                    .app_token(app_token) \
-                    .table_id(table_id) \
-                    .request_body(BatchUpdateAppTableRecordRequestBody.builder()
-                        .records([
-                            AppTableRecord.builder()
-                                .record_id(record_id)
-                                .fields(fixed_fields)
-                                .build()
-                        ])
-                        .build()) \
-                    .build()
-                
-                update_response = client.bitable.v1.app_table_record.batch_update(update_request, option)
-                
-                if update_response.success():
-                    success_count += 1
-                    logger.info(f"  ✅ 更新成功")
-                else:
-                    fail_count += 1
-                    logger.error(f"  ❌ 更新失败: {update_response.code} - {update_response.msg}")
-            else:
-                logger.warning(f"  ⚠️ 跳过: Ticker {ticker} 在飞书表格中不存在")
-        
-        # 结果报告
-        logger.info("🎉 飞书同步完成!")
-        logger.info(f"✅ 成功: {success_count} 条")
-        logger.info(f"❌ 失败: {fail_count} 条")
-        logger.info(f"📊 总计: {len(fixed_records)} 条")
-        
-        return success_count > 0
+        return session.push(df)
         
     except Exception as e:
         logger.error(f"❌ 同步到飞书失败: {str(e)}")
@@ -465,65 +604,186 @@ def step4_sync_to_feishu():
         return False
 
 
-def main():
-    """主执行流程"""
+def preload_feishu_sdk():
+    """预先导入飞书同步所需的模块；导入失败由步骤4报告"""
+    try:
+        import lark_oapi  # noqa: F401
+        import feishu_records  # noqa: F401
+    except ImportError as e:
+        logger.warning(f"⚠️ 预加载飞书SDK失败: {str(e)}")
+    return True
+
+
+def build_pipeline() -> List[Step]:
+    """
+    构建同步流水线
+
+    价格和EPS获取互不依赖，并发执行；两者完成后处理Excel，
+    计算结果在内存中直接交给飞书同步，Excel导出作为旁路输出与同步并行
+    """
+    steps = [
+        Step('price', step1_get_stock_price, description="步骤1 获取价格数据"),
+        Step('eps', step2_get_eps_data, description="步骤2 获取EPS数据"),
+        Step('process', step3_process_excel_data, inputs={'price': 'df_price', 'eps': 'df_eps'},
+             description="步骤3 处理Excel数据"),
+    ]
+    sync_deps = []
+    if feishu_sync_enabled():
+        # lark_oapi导入耗时数秒，与数据获取并行预先导入
+        steps.append(Step('feishu_sdk', preload_feishu_sdk, description="预加载飞书SDK"))
+        sync_deps.append('feishu_sdk')
+    steps.append(Step('sync', step4_sync_to_feishu, deps=sync_deps, inputs={'process': 'df'},
+                      description="步骤4 同步到飞书"))
+    if UPDATED_EXCEL_EXPORT:
+        steps.append(Step('export', export_updated_excel, inputs={'process': 'df'},
+                          description="导出Excel"))
+    return steps
+
+
+def export_run_report(outcome):
+    """汇总本次运行的步骤用时和外部调用指标，输出到日志并写出JSON报告和Prometheus textfile"""
+    report = telemetry.build_report(outcome)
+    log_call_summary(report)
+    try:
+        write_report(report, json_path=RUN_REPORT_FILE, prom_path=METRICS_TEXTFILE)
+        logger.info(f"📈 运行报告已保存到: {RUN_REPORT_FILE}, {METRICS_TEXTFILE}")
+    except Exception as e:
+        logger.warning(f"⚠️ 保存运行报告失败: {str(e)}")
+    return report
+
+
+def run_daemon(interval: float = DAEMON_INTERVAL, max_cycles: Optional[int] = None):
+    """
+    常驻同步：EPS数据和飞书同步会话保留在内存中，交易时段内每interval秒只刷新价格并推送变化的记录
+
+    Args:
+        interval: 同步间隔（秒）
+        max_cycles: 最多执行的轮数，None表示直到收到SIGINT/SIGTERM
+    """
+    import signal
+    from sync_daemon import SyncDaemon
+    
+    session: Optional[FeishuTableSync] = None
+    if feishu_sync_enabled():
+        try:
+            session = create_feishu_session()
+        except Exception as e:
+            logger.error(f"❌ 创建飞书同步会话失败: {str(e)}")
+            return False
+        session.start_token_refresh()
+    else:
+        logger.warning("⚠️ 未设置FEISHU_USER_TOKEN环境变量，常驻模式只更新本地数据")
+    
+    # 上次导出内容的哈希：价格未变化的轮次不重写Excel（Last Updated不参与比较）
+    exported = {'digest': None}
+    
+    def push(df):
+        import pandas as pd
+        
+        if UPDATED_EXCEL_EXPORT:
+            content = df.drop(columns=['Last Updated'], errors='ignore')
+            digest = int(pd.util.hash_pandas_object(content, index=False).sum())
+            if digest != exported['digest']:
+                export_updated_excel(df)
+                exported['digest'] = digest
+            else:
+                logger.info("⏭️ 计算结果未变化，跳过导出Excel")
+        return session.push(df) if session is not None else True
+    
+    def on_cycle(ok: bool, seconds: float):
+        report = telemetry.build_report()
+        report.update({'success': ok, 'duration_seconds': round(seconds, 6)})
+        log_call_summary(report)
+        try:
+            write_report(report, json_path=RUN_REPORT_FILE, prom_path=METRICS_TEXTFILE)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存运行报告失败: {str(e)}")
+        telemetry.reset()
+    
+    daemon = SyncDaemon(
+        fetch_prices=step1_get_stock_price,
+        fetch_eps=step2_get_eps_data,
+        process=step3_process_excel_data,
+        push=push,
+        interval=interval,
+        eps_max_age=EPS_CACHE_TTL_HOURS * 3600,
+        on_cycle=on_cycle
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: daemon.stop())
+    telemetry.reset()
+    try:
+        daemon.run(max_cycles=max_cycles)
+    finally:
+        if session is not None:
+            session.close()
+    return True
+
+
+def main(profile: bool = False, profile_top: int = 15):
+    """
+    主执行流程
+
+    Args:
+        profile: 是否对每个步骤做CPU和内存剖析
+        profile_top: 剖析汇总中列出的热点条数
+    """
     start_time = datetime.now()
     logger.info("=" * 60)
     logger.info("🚀 开始完整的股票数据同步流程")
     logger.info(f"开始时间: {start_time}")
     logger.info("=" * 60)
     
-    success_steps = 0
-    total_steps = 4
-    
+    profiler = None
     try:
-        # 步骤1: 获取股票价格数据
-        if step1_get_stock_price():
-            success_steps += 1
-        else:
-            logger.error("获取价格数据失败，终止流程")
-            return False
-        
-        # 步骤2: 获取EPS数据
-        if step2_get_eps_data():
-            success_steps += 1
-        else:
-            logger.error("获取EPS数据失败，终止流程")
-            return False
+        telemetry.reset()
+        steps = build_pipeline()
+        if profile:
+            from profiling import StepProfiler
+            profiler = StepProfiler(os.path.join(PROFILE_DIR, start_time.strftime('%Y%m%d-%H%M%S')),
+                                    top_n=profile_top)
+            profiler.start()
+            profiler.wrap_steps(steps)
+        # 剖析模式下步骤依次执行，避免各步骤的剖析数据相互干扰
+        outcome = run_pipeline(steps, max_workers=1 if profiler else None)
+        success_steps = sum(1 for timing in outcome.timings.values() if timing.status == STATUS_OK)
         
-        # 步骤3: 处理Excel数据
-        if step3_process_excel_data():
-            success_steps += 1
-        else:
-            logger.error("处理Excel数据失败，终止流程")
-            return False
-        
-        # 步骤4: 同步到飞书
-        if step4_sync_to_feishu():
-            success_steps += 1
-        else:
-            logger.error("同步到飞书失败，终止流程")
-            return False
-        
-        # 完成
         end_time = datetime.now()
-        duration = end_time - start_time
-        
         logger.info("=" * 60)
-        logger.info("🎉 完整的数据同步流程执行成功！")
-        logger.info(f"成功步骤: {success_steps}/{total_steps}")
-        logger.info(f"总用时: {duration.total_seconds():.2f}秒")
+        if outcome.success:
+            logger.info("🎉 完整的数据同步流程执行成功！")
+        else:
+            logger.error("❌ 数据同步流程未完成")
+        logger.info(f"成功步骤: {success_steps}/{len(steps)}")
+        outcome.log_report()
+        export_run_report(outcome)
         logger.info(f"结束时间: {end_time}")
         logger.info("=" * 60)
         
-        return True
+        return outcome.success
         
     except Exception as e:
         logger.error(f"执行过程中发生异常: {str(e)}")
         return False
+    
+    finally:
+        if profiler is not None:
+            profiler.stop()
 
 
 if __name__ == "__main__":
+    import argparse
     import sys
-    success = main()
+    parser = argparse.ArgumentParser(description="股票数据完整同步流程")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"剖析每个步骤的CPU和内存，剖析文件写入 {PROFILE_DIR}/<时间>/")
+    parser.add_argument('--profile-top', type=int, default=15, help="剖析汇总中列出的热点条数")
+    parser.add_argument('--daemon', action='store_true',
+                        help="常驻运行：交易时段内按间隔只刷新价格，推送内容变化的记录")
+    parser.add_argument('--interval', type=float, default=DAEMON_INTERVAL, help="常驻模式的同步间隔（秒）")
+    args = parser.parse_args()
+    if args.daemon:
+        success = run_daemon(interval=args.interval)
+    else:
+        success = main(profile=args.profile, profile_top=args.profile_top)
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -3,6 +3,56 @@ import numpy as np
 from typing import List, Dict, Any, Optional
 import json
 from datetime import datetime
+from pandas.api import types as ptypes
+
+from get_data.watchlist import read_watchlist
+
+# 只保留1位小数的字段
+ONE_DECIMAL_COLUMNS = {'Potential Upside %'}
+
+
+def _convert_cell(value, column: str):
+    """单元格转换规则：空值->""，整数->int，浮点数->按列四舍五入，其余->str"""
+    if pd.isna(value) or value == "":
+        return ""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        if column in ONE_DECIMAL_COLUMNS:
+            return round(float(value), 1)
+        return round(float(value), 6) if value != 0 else 0
+    return str(value)
+
+
+def _convert_column(series: pd.Series, column: str) -> list:
+    """
+    按列一次性完成类型转换和四舍五入
+
+    数值列跳过逐单元格的类型判断，其余列按单元格规则逐个转换；
+    四舍五入使用Python round（np.round在部分.x5边界上结果不同）
+    """
+    if ptypes.is_integer_dtype(series.dtype) and not ptypes.is_extension_array_dtype(series.dtype):
+        return series.tolist()
+    if ptypes.is_float_dtype(series.dtype) and not ptypes.is_extension_array_dtype(series.dtype):
+        values = series.to_numpy(dtype=float).tolist()
+        if column in ONE_DECIMAL_COLUMNS:
+            return ["" if v != v else round(v, 1) for v in values]
+        return ["" if v != v else (round(v, 6) if v != 0 else 0) for v in values]
+    return [_convert_cell(value, column) for value in series.tolist()]
+
+
+def columns_to_records(columns: Dict[str, list]) -> List[Dict[str, Any]]:
+    """
+    将按列组织的值转为飞书记录列表
+
+    Args:
+        columns: 列名 -> 该列全部取值（长度一致）
+
+    Returns:
+        List[Dict[str, Any]]: [{"fields": {...}}, ...]
+    """
+    names = list(columns.keys())
+    return [{"fields": dict(zip(names, row))} for row in zip(*columns.values())]
 
 
 class ExcelToFeishuProcessor:
@@ -29,7 +79,7 @@ class ExcelToFeishuProcessor:
             Exception: 当文件读取失败时
         """
         try:
-            self.df = pd.read_excel(self.excel_path)
+            self.df = read_watchlist(self.excel_path)
             print(f"成功加载Excel文件，共{len(self.df)}行数据")
             return self.df
         except Exception as e:
@@ -83,33 +133,12 @@ class ExcelToFeishuProcessor:
                 raise Exception("请先加载Excel文件")
             cleaned_df = self.clean_data()
         
-        records = []
-        
-        for index, row in cleaned_df.iterrows():
-            # 构建飞书记录格式
-            record = {
-                "fields": {}
-            }
-            
-            # 遍历所有列，转换为飞书字段格式
-            for column in cleaned_df.columns:
-                value = row[column]
-                
-                # 根据数据类型转换值
-                if pd.isna(value) or value == "":
-                    record["fields"][column] = ""
-                elif isinstance(value, (int, np.integer)):
-                    record["fields"][column] = int(value)
-                elif isinstance(value, (float, np.floating)):
-                    # 特殊处理百分比和小数
-                    if column == 'Potential Upside %':
-                        record["fields"][column] = round(float(value), 1)
-                    else:
-                        record["fields"][column] = round(float(value), 6) if value != 0 else 0
-                else:
-                    record["fields"][column] = str(value)
-            
-            records.append(record)
+        # 每列只做一次类型转换和四舍五入，再按行组装
+        columns = {
+            column: _convert_column(cleaned_df[column], column)
+            for column in cleaned_df.columns
+        }
+        records = columns_to_records(columns)
         
         print(f"成功转换{len(records)}条记录为飞书格式")
         return records
@@ -2,79 +2,199 @@ import requests
 import json
 import time
 import os
+import threading
+import logging
+from contextlib import contextmanager
 from typing import Optional, Dict, Any
 from feishu_config import APP_ID, APP_SECRET
+from get_data.atomic_file import atomic_open
+from feishu_http import DEFAULT_FEISHU_DOMAIN, FEISHU_DOMAIN, get_session, request_timeout
+from telemetry import telemetry
+
+try:
+    import fcntl
+except ImportError:  # Windows下没有fcntl，跨进程共享退化为无锁读写
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# token在过期前多少秒即视为失效
+TOKEN_EXPIRY_MARGIN = 300
+# 后台刷新比失效时间再提前多少秒
+BACKGROUND_REFRESH_LEAD = 60
+# 跨进程共享的token缓存文件
+TOKEN_CACHE_FILE = os.getenv(
+    'FEISHU_TOKEN_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.feishu_token_cache.json')
+)
 
 
 class FeishuAuth:
-    """飞书API认证类，负责token获取和管理"""
-    
-    def __init__(self, app_id: str = None, app_secret: str = None):
+    """
+    飞书API认证类，负责token获取和管理
+
+    - 多线程安全：同一时间只有一个线程在刷新，其余线程等待后直接使用新token
+    - 跨进程共享：token与过期时间保存在本地缓存文件中（加文件锁），其他进程直接复用
+    - 后台刷新：可选地在token失效前主动刷新
+    """
+
+    def __init__(self, app_id: str = None, app_secret: str = None, cache_path: Optional[str] = TOKEN_CACHE_FILE):
+        """
+        Args:
+            app_id: 应用ID
+            app_secret: 应用密钥
+            cache_path: token缓存文件路径，None表示不持久化
+        """
         self.app_id = app_id or APP_ID
         self.app_secret = app_secret or APP_SECRET
         self.tenant_access_token: Optional[str] = None
         self.token_expires_at: int = 0
-        self.base_url = "https://open.feishu.cn/open-apis"
-        
+        self.base_url = f"{FEISHU_DOMAIN}/open-apis"
+        self.cache_path = cache_path
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+
     def get_tenant_access_token(self, force_refresh: bool = False) -> str:
         """
         获取tenant_access_token
-        
+
         Args:
             force_refresh: 是否强制刷新token
-            
+
         Returns:
             str: tenant_access_token
-            
+
         Raises:
             Exception: 当获取token失败时
         """
         # 检查token是否还有效（提前5分钟刷新）
-        current_time = int(time.time())
-        if (not force_refresh and 
-            self.tenant_access_token and 
-            current_time < self.token_expires_at - 300):
+        if not force_refresh and self.is_token_valid():
             return self.tenant_access_token
-            
-        # 请求新token
+
+        with self._refresh_lock:
+            # 等待期间其他线程可能已经刷新
+            if not force_refresh and self.is_token_valid():
+                return self.tenant_access_token
+
+            with self._cache_lock():
+                # 其他进程可能已经刷新并写入缓存
+                if not force_refresh and self._load_cached_token():
+                    return self.tenant_access_token
+
+                self._request_token()
+                self._save_cached_token()
+                return self.tenant_access_token
+
+    def _request_token(self):
+        """请求新token"""
         url = f"{self.base_url}/auth/v3/tenant_access_token/internal"
-        
+
         payload = {
             "app_id": self.app_id,
             "app_secret": self.app_secret
         }
-        
+
         headers = {
             'Content-Type': 'application/json'
         }
-        
+
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            if result.get('code') != 0:
-                raise Exception(f"获取token失败: {result.get('msg', '未知错误')}")
-                
+            current_time = int(time.time())
+            with telemetry.track('feishu.tenant_token') as call:
+                response = get_session().post(url, headers=headers, json=payload, timeout=request_timeout(10))
+                call.bytes = len(response.content)
+                if not response.ok:
+                    call.error_code = f"http_{response.status_code}"
+                response.raise_for_status()
+
+                result = response.json()
+
+                if result.get('code') != 0:
+                    call.error_code = str(result.get('code'))
+                    raise Exception(f"获取token失败: {result.get('msg', '未知错误')}")
+
             self.tenant_access_token = result['tenant_access_token']
             # token有效期为2小时，记录过期时间
             self.token_expires_at = current_time + result.get('expire', 7200)
-            
-            print(f"成功获取tenant_access_token，过期时间: {time.ctime(self.token_expires_at)}")
-            return self.tenant_access_token
-            
+
+            logger.info(f"成功获取tenant_access_token，过期时间: {time.ctime(self.token_expires_at)}")
+
         except requests.RequestException as e:
             raise Exception(f"网络请求失败: {str(e)}")
         except json.JSONDecodeError as e:
             raise Exception(f"响应解析失败: {str(e)}")
         except Exception as e:
             raise Exception(f"获取token时发生错误: {str(e)}")
-    
+
+    @property
+    def _cache_key(self) -> str:
+        """缓存中的键；非默认开放平台地址（如本地替身服务）的token单独存放"""
+        if FEISHU_DOMAIN == DEFAULT_FEISHU_DOMAIN:
+            return self.app_id
+        return f"{self.app_id}@{FEISHU_DOMAIN}"
+
+    @contextmanager
+    def _cache_lock(self):
+        """对缓存文件加跨进程排他锁"""
+        if not self.cache_path or fcntl is None:
+            yield
+            return
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.cache_path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_cached_token(self) -> bool:
+        """从缓存文件读取仍然有效的token，成功返回True"""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f).get(self._cache_key) or {}
+        except Exception as e:
+            logger.warning(f"token缓存文件损坏，忽略: {e}")
+            return False
+
+        token = cached.get('tenant_access_token')
+        expires_at = int(cached.get('expires_at', 0))
+        if not token or int(time.time()) >= expires_at - TOKEN_EXPIRY_MARGIN:
+            return False
+
+        self.tenant_access_token = token
+        self.token_expires_at = expires_at
+        return True
+
+    def _save_cached_token(self):
+        """将token写入缓存文件（调用方需持有缓存锁）"""
+        if not self.cache_path:
+            return
+        try:
+            cache: Dict[str, Any] = {}
+            if os.path.exists(self.cache_path):
+                try:
+                    with open(self.cache_path, 'r', encoding='utf-8') as f:
+                        cache = json.load(f)
+                except Exception:
+                    cache = {}
+            cache[self._cache_key] = {
+                'tenant_access_token': self.tenant_access_token,
+                'expires_at': self.token_expires_at,
+            }
+            with atomic_open(self.cache_path, permissions=0o600) as f:
+                json.dump(cache, f)
+        except Exception as e:
+            logger.warning(f"保存token缓存失败: {e}")
+
     def get_auth_headers(self) -> Dict[str, str]:
         """
         获取包含认证信息的请求头
-        
+
         Returns:
             Dict[str, str]: 包含Authorization头的字典
         """
@@ -83,38 +203,73 @@ class FeishuAuth:
             'Authorization': f'Bearer {token}',
             'Content-Type': 'application/json'
         }
-    
+
     def is_token_valid(self) -> bool:
         """
         检查当前token是否有效
-        
+
         Returns:
             bool: token是否有效
         """
         if not self.tenant_access_token:
             return False
-            
+
         current_time = int(time.time())
-        return current_time < self.token_expires_at - 300  # 提前5分钟判定过期
-    
+        return current_time < self.token_expires_at - TOKEN_EXPIRY_MARGIN  # 提前5分钟判定过期
+
     def refresh_token(self) -> str:
         """
         强制刷新token
-        
+
         Returns:
             str: 新的tenant_access_token
         """
         return self.get_tenant_access_token(force_refresh=True)
 
+    def start_background_refresh(self):
+        """启动后台线程，在token失效前主动刷新"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._background_refresh_loop, name="feishu-token-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        """停止后台刷新线程"""
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout=5)
+            self._refresh_thread = None
 
-# 全局认证实例
+    def _background_refresh_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.get_tenant_access_token()
+                refresh_at = self.token_expires_at - TOKEN_EXPIRY_MARGIN - BACKGROUND_REFRESH_LEAD
+                wait = max(1, refresh_at - int(time.time()))
+            except Exception as e:
+                logger.warning(f"后台刷新token失败，30秒后重试: {e}")
+                wait = 30
+            if self._stop_event.wait(wait):
+                break
+            if not self._stop_event.is_set() and self.is_token_valid():
+                # 到达提前刷新时间点但token尚未失效，强制换新
+                try:
+                    self.refresh_token()
+                except Exception as e:
+                    logger.warning(f"后台刷新token失败: {e}")
+
+
+# 全局认证实例（进程内共享）
 feishu_auth = FeishuAuth()
 
 
 def get_feishu_headers() -> Dict[str, str]:
     """
     便捷函数：获取飞书API请求头
-    
+
     Returns:
         Dict[str, str]: 包含认证信息的请求头
     """
@@ -122,16 +277,17 @@ def get_feishu_headers() -> Dict[str, str]:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     # 测试认证功能
     auth = FeishuAuth()
     try:
         token = auth.get_tenant_access_token()
         print(f"获取到token: {token[:20]}...")
-        
+
         headers = auth.get_auth_headers()
         print(f"认证头: Authorization: Bearer {headers['Authorization'][7:27]}...")
-        
+
         print(f"Token有效性: {auth.is_token_valid()}")
-        
+
     except Exception as e:
-        print(f"认证测试失败: {e}")
\ No newline at end of file
+        print(f"认证测试失败: {e}")
@@ -0,0 +1,119 @@
+"""
+飞书API共享HTTP传输
+所有飞书请求（获取token、多维表格记录读写）复用同一个带连接池的requests.Session，
+保持长连接，避免每次请求重新建立TCP+TLS连接；lark_oapi客户端也在进程内共享
+"""
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 飞书开放平台地址，可指向本地替身服务做离线压测
+DEFAULT_FEISHU_DOMAIN = 'https://open.feishu.cn'
+FEISHU_DOMAIN = os.getenv('FEISHU_DOMAIN', DEFAULT_FEISHU_DOMAIN)
+# 连接池大小，默认与飞书同步并发数一致
+POOL_SIZE = int(os.getenv('FEISHU_HTTP_POOL_SIZE', os.getenv('FEISHU_SYNC_MAX_WORKERS', '8')))
+# 建立连接和读取响应的超时时间（秒）
+CONNECT_TIMEOUT = float(os.getenv('FEISHU_HTTP_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('FEISHU_HTTP_READ_TIMEOUT', '30'))
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_clients: Dict[Tuple[str, str, str], object] = {}
+
+
+def request_timeout(read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    """返回requests使用的 (连接超时, 读取超时)"""
+    return CONNECT_TIMEOUT, READ_TIMEOUT if read_timeout is None else read_timeout
+
+
+def get_session() -> requests.Session:
+    """获取进程内共享的HTTP会话"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=max(1, POOL_SIZE))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+                logger.debug(f"创建飞书HTTP连接池，大小 {POOL_SIZE}")
+    return _session
+
+
+class _SessionTransport:
+    """
+    替换lark_oapi传输层引用的requests模块
+
+    lark_oapi直接调用requests.request，每次请求都新建连接；
+    这里将request转发给共享会话，其余属性仍取自requests模块
+    """
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+
+    def request(self, method, url, timeout=None, **kwargs):
+        return self.session.request(method, url, timeout=request_timeout(timeout), **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def response_size(response) -> int:
+    """lark_oapi响应的原始字节数"""
+    raw = getattr(response, 'raw', None)
+    return len(getattr(raw, 'content', None) or b'')
+
+
+def _install_lark_transport():
+    try:
+        from lark_oapi.core.http import transport as lark_transport
+    except ImportError:
+        return
+    if isinstance(getattr(lark_transport, 'requests', None), _SessionTransport):
+        return
+    if not hasattr(lark_transport, 'requests'):
+        logger.warning("⚠️ 当前lark_oapi版本不支持替换传输层，飞书记录请求不使用连接池")
+        return
+    lark_transport.requests = _SessionTransport(get_session())
+
+
+def get_lark_client(app_id: str, app_secret: str, domain: Optional[str] = None):
+    """
+    获取共享的lark_oapi客户端
+
+    同一应用只构建一次客户端，请求经由共享连接池发送
+
+    Args:
+        app_id: 应用ID
+        app_secret: 应用密钥
+        domain: 开放平台地址，默认FEISHU_DOMAIN
+    """
+    domain = domain or FEISHU_DOMAIN
+    key = (app_id, app_secret, domain)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    import lark_oapi as lark
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = lark.Client.builder() \
+                .app_id(app_id) \
+                .app_secret(app_secret) \
+                .domain(domain) \
+                .enable_set_token(True) \
+                .timeout(READ_TIMEOUT) \
+                .log_level(lark.LogLevel.INFO) \
+                .build()
+            _clients[key] = client
+    _install_lark_transport()
+    return client
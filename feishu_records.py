@@ -0,0 +1,393 @@
+"""
+飞书多维表格记录批量读写
+- 写入：将记录按API上限(500条)分块打包，按AIMD自适应并发发送，被限流的分块重新排队，
+  并根据批量响应逐条汇报成功/失败
+- 读取：按page_token逐页流式列出记录，只请求需要的字段
+"""
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional, Iterator
+
+from lark_oapi.api.bitable.v1 import (
+    AppTableRecord, ListAppTableRecordRequest,
+    BatchCreateAppTableRecordRequest, BatchCreateAppTableRecordRequestBody,
+    BatchUpdateAppTableRecordRequest, BatchUpdateAppTableRecordRequestBody,
+)
+
+from feishu_http import response_size
+from feishu_throttle import AdaptiveConcurrency, MAX_THROTTLE_RETRIES, RateLimited, check_rate_limit
+from telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+# 飞书批量接口单次请求的最大记录数
+MAX_BATCH_SIZE = 500
+# 默认最大并发发送的分块数
+DEFAULT_MAX_WORKERS = 8
+# 列表接口单页最大记录数
+MAX_PAGE_SIZE = 500
+
+
+def field_text(value) -> str:
+    """
+    将飞书返回的字段值转为纯文本
+    文本字段可能以富文本片段列表返回，如 [{'type': 'text', 'text': '002156.SZ'}]；
+    超链接字段返回 {'text': ..., 'link': ...}，取链接地址
+    """
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return str(value.get('link', value.get('text', '')))
+    if isinstance(value, list):
+        return "".join(
+            str(part.get('text', '')) if isinstance(part, dict) else str(part)
+            for part in value
+        )
+    return str(value)
+
+
+def iter_records(client, option, app_token: str, table_id: str,
+                 field_names: Optional[List[str]] = None,
+                 page_size: int = MAX_PAGE_SIZE) -> Iterator[AppTableRecord]:
+    """
+    流式列出数据表中的全部记录，自动跟随has_more/page_token翻页
+
+    Args:
+        client: lark_oapi客户端
+        option: 请求选项（携带user_access_token），可为None
+        app_token: 多维表格app_token
+        table_id: 数据表ID
+        field_names: 只返回这些字段，None表示返回全部字段
+        page_size: 每页记录数，不超过MAX_PAGE_SIZE
+
+    Yields:
+        AppTableRecord: 每页到达后逐条产出记录
+
+    Raises:
+        Exception: 当某一页请求失败或持续被限流时
+    """
+    page_token = None
+    page = 0
+    throttled = 0
+
+    while True:
+        builder = ListAppTableRecordRequest.builder() \
+            .app_token(app_token) \
+            .table_id(table_id) \
+            .page_size(max(1, min(page_size, MAX_PAGE_SIZE)))
+        if field_names:
+            builder = builder.field_names(json.dumps(field_names, ensure_ascii=False))
+        if page_token:
+            builder = builder.page_token(page_token)
+
+        method = client.bitable.v1.app_table_record.list
+        with telemetry.track('feishu.list_records') as call:
+            response = method(builder.build(), option) if option is not None else method(builder.build())
+            call.bytes = response_size(response)
+            if not response.success():
+                call.error_code = str(response.code)
+        try:
+            check_rate_limit(response)
+        except RateLimited as e:
+            throttled += 1
+            telemetry.record_retry('feishu.list_records')
+            if throttled > MAX_THROTTLE_RETRIES:
+                raise Exception(f"获取飞书记录失败 (第{page + 1}页): 持续被限流 {e}")
+            logger.warning(f"  ⏳ 列出记录被限流，{e.retry_after:.1f} 秒后重试第{page + 1}页")
+            time.sleep(e.retry_after)
+            continue
+        if not response.success():
+            raise Exception(f"获取飞书记录失败 (第{page + 1}页): {response.code}, {response.msg}")
+
+        page += 1
+        throttled = 0
+        data = response.data
+        items = (data.items if data else None) or []
+        logger.debug(f"  第{page}页: {len(items)} 条记录")
+        yield from items
+
+        if not (data and data.has_more and data.page_token):
+            break
+        page_token = data.page_token
+
+
+def build_ticker_map(client, option, app_token: str, table_id: str,
+                     ticker_field: str = 'Ticker') -> Dict[str, str]:
+    """
+    构建 Ticker -> record_id 映射，仅请求Ticker字段
+
+    Returns:
+        Dict[str, str]: Ticker到record_id的映射
+    """
+    ticker_map = {}
+    record_count = 0
+    for record in iter_records(client, option, app_token, table_id, field_names=[ticker_field]):
+        record_count += 1
+        ticker = field_text((record.fields or {}).get(ticker_field))
+        if ticker:
+            ticker_map[ticker] = record.record_id
+
+    logger.info(f"📋 获取到飞书记录: {record_count} 条")
+    return ticker_map
+
+
+def chunk_records(records: List[Dict[str, Any]], chunk_size: int = MAX_BATCH_SIZE) -> List[List[Dict[str, Any]]]:
+    """
+    将记录列表按chunk_size切分
+
+    Args:
+        records: 记录列表
+        chunk_size: 每块最大记录数，不超过MAX_BATCH_SIZE
+
+    Returns:
+        List[List[Dict[str, Any]]]: 分块后的记录列表
+    """
+    chunk_size = max(1, min(chunk_size, MAX_BATCH_SIZE))
+    return [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+
+
+class BatchWriteResult:
+    """批量写入结果，按记录汇总成功与失败"""
+
+    def __init__(self):
+        # 成功写入的记录ID
+        self.succeeded: List[str] = []
+        # 失败的记录: {'record_id', 'ticker', 'code', 'msg'}
+        self.failed: List[Dict[str, Any]] = []
+        self.request_count = 0
+        # 因频率限制被重新排队的请求数
+        self.throttle_count = 0
+
+    @property
+    def success_count(self) -> int:
+        return len(self.succeeded)
+
+    @property
+    def fail_count(self) -> int:
+        return len(self.failed)
+
+    def merge(self, other: "BatchWriteResult"):
+        self.succeeded.extend(other.succeeded)
+        self.failed.extend(other.failed)
+        self.request_count += other.request_count
+        self.throttle_count += other.throttle_count
+
+
+class RecordBatchWriter:
+    """飞书多维表格批量写入器，负责分块、自适应并发发送和逐条结果解析"""
+
+    def __init__(self, client, option, app_token: str, table_id: str,
+                 chunk_size: int = MAX_BATCH_SIZE, max_workers: int = DEFAULT_MAX_WORKERS,
+                 initial_workers: Optional[int] = None):
+        """
+        初始化写入器
+
+        Args:
+            client: lark_oapi客户端
+            option: 请求选项（携带user_access_token），可为None
+            app_token: 多维表格app_token
+            table_id: 数据表ID
+            chunk_size: 每个请求打包的记录数
+            max_workers: 同时在途请求数的上限
+            initial_workers: 初始在途请求数，默认为上限的一半；之后按响应情况自适应调整
+        """
+        self.client = client
+        self.option = option
+        self.app_token = app_token
+        self.table_id = table_id
+        self.chunk_size = chunk_size
+        self.max_workers = max(1, max_workers)
+        self.initial_workers = initial_workers or max(1, self.max_workers // 2)
+
+    def _call(self, method, request):
+        if self.option is not None:
+            return method(request, self.option)
+        return method(request)
+
+    def _update_chunk(self, chunk: List[Dict[str, Any]]) -> BatchWriteResult:
+        """发送一个batch_update分块，chunk中每项为 {'record_id': ..., 'fields': {...}}"""
+        result = BatchWriteResult()
+        result.request_count = 1
+
+        request = BatchUpdateAppTableRecordRequest.builder() \
+            .app_token(self.app_token) \
+            .table_id(self.table_id) \
+            .request_body(BatchUpdateAppTableRecordRequestBody.builder()
+                .records([
+                    AppTableRecord.builder()
+                        .record_id(item['record_id'])
+                        .fields(item['fields'])
+                        .build()
+                    for item in chunk
+                ])
+                .build()) \
+            .build()
+
+        try:
+            with telemetry.track('feishu.batch_update') as call:
+                response = self._call(self.client.bitable.v1.app_table_record.batch_update, request)
+                call.bytes = response_size(response)
+                if not response.success():
+                    call.error_code = str(response.code)
+        except Exception as e:
+            self._fail_chunk(result, chunk, -1, str(e))
+            return result
+
+        check_rate_limit(response)
+        if not response.success():
+            self._fail_chunk(result, chunk, response.code, response.msg)
+            return result
+
+        returned_ids = {
+            record.record_id
+            for record in ((response.data.records if response.data else None) or [])
+        }
+        for item in chunk:
+            if item['record_id'] in returned_ids:
+                result.succeeded.append(item['record_id'])
+            else:
+                result.failed.append(self._failure(item, response.code, "记录未出现在批量响应中"))
+        return result
+
+    def _create_chunk(self, chunk: List[Dict[str, Any]]) -> BatchWriteResult:
+        """发送一个batch_create分块，chunk中每项为 {'fields': {...}}"""
+        result = BatchWriteResult()
+        result.request_count = 1
+
+        request = BatchCreateAppTableRecordRequest.builder() \
+            .app_token(self.app_token) \
+            .table_id(self.table_id) \
+            .request_body(BatchCreateAppTableRecordRequestBody.builder()
+                .records([
+                    AppTableRecord.builder().fields(item['fields']).build()
+                    for item in chunk
+                ])
+                .build()) \
+            .build()
+
+        try:
+            with telemetry.track('feishu.batch_create') as call:
+                response = self._call(self.client.bitable.v1.app_table_record.batch_create, request)
+                call.bytes = response_size(response)
+                if not response.success():
+                    call.error_code = str(response.code)
+        except Exception as e:
+            self._fail_chunk(result, chunk, -1, str(e))
+            return result
+
+        check_rate_limit(response)
+        if not response.success():
+            self._fail_chunk(result, chunk, response.code, response.msg)
+            return result
+
+        # batch_create按请求顺序返回新记录
+        created = (response.data.records if response.data else None) or []
+        for i, item in enumerate(chunk):
+            if i < len(created) and created[i].record_id:
+                result.succeeded.append(created[i].record_id)
+            else:
+                result.failed.append(self._failure(item, response.code, "记录未出现在批量响应中"))
+        return result
+
+    @staticmethod
+    def _failure(item: Dict[str, Any], code, msg) -> Dict[str, Any]:
+        return {
+            'record_id': item.get('record_id'),
+            'ticker': item.get('fields', {}).get('Ticker', ''),
+            'code': code,
+            'msg': msg,
+        }
+
+    def _fail_chunk(self, result: BatchWriteResult, chunk: List[Dict[str, Any]], code, msg):
+        logger.error(f"  ❌ 批量请求失败 ({len(chunk)} 条): {code} - {msg}")
+        result.failed.extend(self._failure(item, code, msg) for item in chunk)
+
+    def _dispatch(self, send_chunk, records: List[Dict[str, Any]], kind: str) -> BatchWriteResult:
+        """分块并按自适应并发发送，被限流的分块重新排队；kind为指标中的调用类别"""
+        total = BatchWriteResult()
+        chunks = chunk_records(records, self.chunk_size)
+        if not chunks:
+            return total
+
+        max_workers = min(self.max_workers, len(chunks))
+        controller = AdaptiveConcurrency(initial=self.initial_workers, maximum=max_workers)
+        logger.info(f"📦 共 {len(records)} 条记录，分为 {len(chunks)} 个批次，"
+                    f"并发数 {controller.limit}（上限 {max_workers}）")
+
+        # (批次序号, 分块, 已限流次数)
+        pending = deque((i, chunk, 0) for i, chunk in enumerate(chunks, 1))
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or in_flight:
+                pause = controller.pause_remaining()
+                while pending and not pause and len(in_flight) < controller.limit:
+                    index, chunk, throttled = pending.popleft()
+                    future = executor.submit(send_chunk, chunk)
+                    in_flight[future] = (index, chunk, throttled, time.monotonic())
+                if not in_flight:
+                    time.sleep(pause)
+                    continue
+
+                done, _ = wait(in_flight, timeout=pause or None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, chunk, throttled, started_at = in_flight.pop(future)
+                    try:
+                        chunk_result = future.result()
+                    except RateLimited as e:
+                        controller.on_throttle(e.retry_after, started_at)
+                        total.request_count += 1
+                        total.throttle_count += 1
+                        if throttled < MAX_THROTTLE_RETRIES:
+                            telemetry.record_retry(kind)
+                            pending.appendleft((index, chunk, throttled + 1))
+                            continue
+                        chunk_result = BatchWriteResult()
+                        self._fail_chunk(chunk_result, chunk, e.code, f"持续被限流: {e.msg}")
+                    else:
+                        controller.on_success()
+                    logger.info(f"  批次 {index}/{len(chunks)}: "
+                                f"成功 {chunk_result.success_count} 条，失败 {chunk_result.fail_count} 条")
+                    total.merge(chunk_result)
+
+        return total
+
+    def update(self, records: List[Dict[str, Any]]) -> BatchWriteResult:
+        """
+        批量更新记录
+
+        Args:
+            records: [{'record_id': ..., 'fields': {...}}, ...]
+
+        Returns:
+            BatchWriteResult: 逐条写入结果
+        """
+        return self._dispatch(self._update_chunk, records, 'feishu.batch_update')
+
+    def create(self, records: List[Dict[str, Any]]) -> BatchWriteResult:
+        """
+        批量新增记录
+
+        Args:
+            records: [{'fields': {...}}, ...]
+
+        Returns:
+            BatchWriteResult: 逐条写入结果，succeeded中为新记录ID
+        """
+        return self._dispatch(self._create_chunk, records, 'feishu.batch_create')
+
+
+def log_write_result(result: BatchWriteResult, total: int, max_failures: int = 20):
+    """输出批量写入结果报告"""
+    logger.info(f"✅ 成功: {result.success_count} 条")
+    logger.info(f"❌ 失败: {result.fail_count} 条")
+    logger.info(f"📨 请求数: {result.request_count} 次")
+    if result.throttle_count:
+        logger.info(f"⏳ 限流重试: {result.throttle_count} 次")
+    logger.info(f"📊 总计: {total} 条")
+    for failure in result.failed[:max_failures]:
+        logger.error(f"  ❌ {failure['ticker']} ({failure['record_id']}): {failure['code']} - {failure['msg']}")
+    if result.fail_count > max_failures:
+        logger.error(f"  ... 另有 {result.fail_count - max_failures} 条失败记录未显示")
@@ -0,0 +1,402 @@
+"""
+飞书多维表格字段结构与类型转换
+从数据表读取字段定义（带版本号缓存到本地），编译为逐列的转换函数表，
+Excel数据按列一次性完成字段名映射和类型转换
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+import pandas as pd
+
+from data_processor import columns_to_records
+from get_data.atomic_file import atomic_open
+from telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，格式变化时旧缓存自动失效
+SCHEMA_CACHE_VERSION = 1
+
+# 飞书字段类型
+FIELD_TYPE_TEXT = 1
+FIELD_TYPE_NUMBER = 2
+FIELD_TYPE_SINGLE_SELECT = 3
+FIELD_TYPE_MULTI_SELECT = 4
+FIELD_TYPE_DATE = 5
+FIELD_TYPE_CHECKBOX = 7
+FIELD_TYPE_USER = 11
+FIELD_TYPE_PHONE = 13
+FIELD_TYPE_URL = 15
+FIELD_TYPE_ATTACHMENT = 17
+FIELD_TYPE_SINGLE_LINK = 18
+FIELD_TYPE_LOOKUP = 19
+FIELD_TYPE_FORMULA = 20
+FIELD_TYPE_DUPLEX_LINK = 21
+FIELD_TYPE_LOCATION = 22
+FIELD_TYPE_GROUP_CHAT = 23
+FIELD_TYPE_CREATED_TIME = 1001
+FIELD_TYPE_MODIFIED_TIME = 1002
+FIELD_TYPE_CREATED_USER = 1003
+FIELD_TYPE_MODIFIED_USER = 1004
+FIELD_TYPE_AUTO_NUMBER = 1005
+
+# 由飞书计算的只读字段，写入会被拒绝
+READ_ONLY_FIELD_TYPES = {
+    FIELD_TYPE_LOOKUP, FIELD_TYPE_FORMULA,
+    FIELD_TYPE_CREATED_TIME, FIELD_TYPE_MODIFIED_TIME,
+    FIELD_TYPE_CREATED_USER, FIELD_TYPE_MODIFIED_USER, FIELD_TYPE_AUTO_NUMBER,
+}
+
+# 需要飞书内部ID（人员、附件、关联记录等）的字段，无法由Excel文本写入
+UNSUPPORTED_FIELD_TYPES = {
+    FIELD_TYPE_USER, FIELD_TYPE_ATTACHMENT, FIELD_TYPE_SINGLE_LINK,
+    FIELD_TYPE_DUPLEX_LINK, FIELD_TYPE_LOCATION, FIELD_TYPE_GROUP_CHAT,
+}
+
+# Excel中日期/时间文本的时区（与Last Updated一致使用北京时间）
+DATE_TIMEZONE = 'Asia/Shanghai'
+# 多选字段在Excel中的分隔符
+MULTI_SELECT_SEPARATORS = (',', '，', '、', ';', '；')
+CHECKBOX_TRUE_TEXT = {'true', 'yes', 'y', '1', '是', '√', '✓', '✔'}
+
+# 字段名映射 (Excel -> 飞书)
+FIELD_NAME_MAPPING = {
+    'Sector/Theme': 'Sector|Theme',
+    'Source / Link': 'Source | Link',
+}
+
+# 无法读取字段定义时使用的默认结构（PE和EPS在飞书中为文本字段）
+FALLBACK_FIELD_TYPES = {
+    'Ticker': FIELD_TYPE_TEXT,
+    'Name': FIELD_TYPE_TEXT,
+    'Sector|Theme': FIELD_TYPE_TEXT,
+    'Current Price': FIELD_TYPE_NUMBER,
+    'PE (2025E)': FIELD_TYPE_TEXT,
+    'EPS (2025E)': FIELD_TYPE_TEXT,
+    'Market Cap (CNY bn)': FIELD_TYPE_NUMBER,
+    'Safe Buy Low': FIELD_TYPE_NUMBER,
+    'Safe Buy High': FIELD_TYPE_NUMBER,
+    'Extreme Safe': FIELD_TYPE_NUMBER,
+    'Target Low': FIELD_TYPE_NUMBER,
+    'Target High': FIELD_TYPE_NUMBER,
+    'Mid Target': FIELD_TYPE_NUMBER,
+    'Potential Upside %': FIELD_TYPE_NUMBER,
+    'Stop Loss': FIELD_TYPE_NUMBER,
+    'Source | Link': FIELD_TYPE_TEXT,
+    'Notes': FIELD_TYPE_TEXT,
+    'Last Updated': FIELD_TYPE_TEXT,
+}
+
+
+def _to_number(value):
+    """数字字段：空值和无法解析的值为0"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        try:
+            return float(value) if '.' in value else int(value)
+        except ValueError:
+            return 0
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return 0
+    return 0 if number != number else number
+
+
+def _to_text(value):
+    """文本字段：空值为空字符串"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    return str(value)
+
+
+def _to_single_select(value):
+    """单选字段：选项名文本，空值为None（清空选项）"""
+    text = _to_text(value).strip()
+    return text or None
+
+
+def _to_multi_select(value):
+    """多选字段：选项名列表，Excel中以逗号、顿号或分号分隔"""
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    text = _to_text(value)
+    for separator in MULTI_SELECT_SEPARATORS[1:]:
+        text = text.replace(separator, MULTI_SELECT_SEPARATORS[0])
+    return [item.strip() for item in text.split(MULTI_SELECT_SEPARATORS[0]) if item.strip()]
+
+
+def _to_date(value):
+    """日期字段：毫秒时间戳，无时区的日期文本按北京时间解析，空值和无法解析的值为None"""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # 已是时间戳：秒级时间戳转为毫秒
+        return int(value * 1000) if abs(value) < 1e11 else int(value)
+    text = _to_text(value).strip()
+    if text.endswith(' CST'):
+        text = text[:-4]
+    if not text:
+        return None
+    try:
+        timestamp = pd.Timestamp(text)
+    except (ValueError, TypeError):
+        return None
+    if pd.isna(timestamp):
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize(DATE_TIMEZONE)
+    return int(timestamp.timestamp() * 1000)
+
+
+def _to_checkbox(value):
+    """复选框字段：布尔值"""
+    if isinstance(value, str):
+        return value.strip().lower() in CHECKBOX_TRUE_TEXT
+    if value is None or (isinstance(value, float) and value != value):
+        return False
+    return bool(value)
+
+
+def _to_url(value):
+    """超链接字段：{'text': 显示文本, 'link': 地址}，空值为None"""
+    if isinstance(value, dict):
+        return value
+    text = _to_text(value).strip()
+    return {'text': text, 'link': text} if text else None
+
+
+_CONVERTERS: Dict[int, Callable[[Any], Any]] = {
+    FIELD_TYPE_TEXT: _to_text,
+    FIELD_TYPE_NUMBER: _to_number,
+    FIELD_TYPE_SINGLE_SELECT: _to_single_select,
+    FIELD_TYPE_MULTI_SELECT: _to_multi_select,
+    FIELD_TYPE_DATE: _to_date,
+    FIELD_TYPE_CHECKBOX: _to_checkbox,
+    FIELD_TYPE_PHONE: _to_text,
+    FIELD_TYPE_URL: _to_url,
+}
+
+
+def is_writable(field_type: Optional[int]) -> bool:
+    """字段是否可由Excel数据写入；只读字段和需要飞书内部ID的字段不可写"""
+    return field_type not in READ_ONLY_FIELD_TYPES and field_type not in UNSUPPORTED_FIELD_TYPES
+
+
+def converter_for(field_type: Optional[int]) -> Callable[[Any], Any]:
+    """按字段类型返回转换函数，未知类型按文本处理"""
+    return _CONVERTERS.get(field_type, _to_text)
+
+
+def fetch_field_types(client, option, app_token: str, table_id: str) -> Dict[str, int]:
+    """
+    分页读取数据表的字段定义
+
+    Returns:
+        Dict[str, int]: 字段名 -> 字段类型
+
+    Raises:
+        Exception: 请求失败时
+    """
+    from lark_oapi.api.bitable.v1 import ListAppTableFieldRequest
+
+    from feishu_http import response_size
+
+    field_types = {}
+    page_token = None
+    while True:
+        builder = ListAppTableFieldRequest.builder() \
+            .app_token(app_token) \
+            .table_id(table_id) \
+            .page_size(100)
+        if page_token:
+            builder = builder.page_token(page_token)
+
+        method = client.bitable.v1.app_table_field.list
+        with telemetry.track('feishu.list_fields') as call:
+            response = method(builder.build(), option) if option is not None else method(builder.build())
+            call.bytes = response_size(response)
+            if not response.success():
+                call.error_code = str(response.code)
+        if not response.success():
+            raise Exception(f"获取字段信息失败: {response.code} - {response.msg}")
+
+        data = response.data
+        for field in (data.items if data else None) or []:
+            field_types[field.field_name] = field.type
+
+        if not (data and data.has_more and data.page_token):
+            break
+        page_token = data.page_token
+
+    return field_types
+
+
+def schema_version(field_types: Dict[str, int]) -> str:
+    """字段结构的版本号：字段名与类型的哈希"""
+    payload = json.dumps(sorted(field_types.items()), ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+class FieldSchemaCache:
+    """字段定义的本地缓存"""
+
+    def __init__(self, path: str, table_key: str, ttl_seconds: float):
+        """
+        初始化缓存
+
+        Args:
+            path: 缓存文件路径
+            table_key: 数据表标识（app_token/table_id）
+            ttl_seconds: 缓存有效期（秒）
+        """
+        self.path = path
+        self.table_key = table_key
+        self.ttl_seconds = ttl_seconds
+
+    def load(self) -> Optional[Dict[str, int]]:
+        """返回有效的缓存字段定义，缺失、过期或版本不符时返回None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ 字段缓存文件损坏，忽略: {e}")
+            return None
+
+        if (cached.get('cache_version') != SCHEMA_CACHE_VERSION
+                or cached.get('table') != self.table_key
+                or time.time() - cached.get('fetched_at', 0) > self.ttl_seconds):
+            return None
+        fields = cached.get('fields') or {}
+        if cached.get('schema_version') != schema_version(fields):
+            return None
+        return fields
+
+    def save(self, field_types: Dict[str, int]):
+        with atomic_open(self.path) as f:
+            json.dump({
+                'cache_version': SCHEMA_CACHE_VERSION,
+                'table': self.table_key,
+                'fetched_at': time.time(),
+                'schema_version': schema_version(field_types),
+                'fields': field_types,
+            }, f, ensure_ascii=False, indent=2)
+
+
+class FieldCoercer:
+    """由字段定义编译出的转换表：Excel列名 -> (飞书字段名, 转换函数)"""
+
+    def __init__(self, field_types: Dict[str, int], strict: bool = False,
+                 name_mapping: Optional[Dict[str, str]] = None):
+        """
+        初始化转换器
+
+        Args:
+            field_types: 飞书字段名 -> 字段类型
+            strict: 为True时丢弃数据表中不存在的列（字段定义来自数据表时使用）
+            name_mapping: 字段名映射 (Excel -> 飞书)
+        """
+        self.field_types = field_types
+        self.strict = strict
+        self.name_mapping = FIELD_NAME_MAPPING if name_mapping is None else name_mapping
+        self.version = schema_version(field_types)
+        self._plans: Dict[Tuple[str, ...], List[Tuple[str, str, Callable[[Any], Any]]]] = {}
+
+    def compile(self, columns) -> List[Tuple[str, str, Callable[[Any], Any]]]:
+        """
+        为一组Excel列编译转换计划
+
+        Returns:
+            List[Tuple[str, str, Callable]]: (Excel列名, 飞书字段名, 转换函数)
+        """
+        key = tuple(columns)
+        plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+
+        plan = []
+        dropped = []
+        read_only = []
+        for column in key:
+            target = self.name_mapping.get(column, column)
+            if self.strict and target not in self.field_types:
+                dropped.append(column)
+                continue
+            field_type = self.field_types.get(target)
+            if not is_writable(field_type):
+                read_only.append(f"{column}({field_type})")
+                continue
+            plan.append((column, target, converter_for(field_type)))
+        if dropped:
+            logger.warning(f"⚠️ 以下列在飞书表格中不存在，已忽略: {', '.join(map(str, dropped))}")
+        if read_only:
+            logger.warning(f"⚠️ 以下列在飞书表格中为只读或不支持写入的字段类型，已忽略: {', '.join(read_only)}")
+
+        self._plans[key] = plan
+        return plan
+
+    def coerce(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """转换单条记录的字段"""
+        return {
+            target: convert(fields[column])
+            for column, target, convert in self.compile(fields.keys())
+        }
+
+    def records_from_dataframe(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        按列转换整个DataFrame为飞书记录
+
+        Returns:
+            List[Dict[str, Any]]: [{"fields": {...}}, ...]
+        """
+        columns = {}
+        for column, target, convert in self.compile(df.columns):
+            values = df[column].astype(object).where(df[column].notna(), None).tolist()
+            columns[target] = [convert(value) for value in values]
+        return columns_to_records(columns)
+
+
+def load_field_coercer(client, option, app_token: str, table_id: str,
+                       cache_path: str, ttl_seconds: float,
+                       force_refresh: bool = False) -> FieldCoercer:
+    """
+    获取字段转换器：优先使用本地缓存，其次读取数据表，失败时使用默认结构
+
+    Args:
+        cache_path: 字段缓存文件路径
+        ttl_seconds: 缓存有效期（秒）
+        force_refresh: 忽略缓存重新读取
+    """
+    cache = FieldSchemaCache(cache_path, f"{app_token}/{table_id}", ttl_seconds)
+    field_types = None if force_refresh else cache.load()
+    if field_types is not None:
+        coercer = FieldCoercer(field_types, strict=True)
+        logger.info(f"🧩 使用缓存的字段结构: {len(field_types)} 个字段 (版本 {coercer.version})")
+        return coercer
+
+    try:
+        field_types = fetch_field_types(client, option, app_token, table_id)
+    except Exception as e:
+        logger.warning(f"⚠️ 读取字段结构失败，使用默认结构: {e}")
+        return FieldCoercer(FALLBACK_FIELD_TYPES, strict=False)
+    if not field_types:
+        logger.warning("⚠️ 数据表没有返回任何字段，使用默认结构")
+        return FieldCoercer(FALLBACK_FIELD_TYPES, strict=False)
+
+    try:
+        cache.save(field_types)
+    except Exception as e:
+        logger.warning(f"⚠️ 保存字段缓存失败: {e}")
+
+    coercer = FieldCoercer(field_types, strict=True)
+    logger.info(f"🧩 读取字段结构: {len(field_types)} 个字段 (版本 {coercer.version})")
+    return coercer
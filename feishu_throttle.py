@@ -0,0 +1,121 @@
+"""
+飞书API频率限制处理
+- 识别频率限制响应（HTTP 429或限流错误码）及其建议等待时间
+- AIMD并发控制：响应正常时逐步增加在途请求数，触发限流时减半
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 表示请求频率超限的错误码
+RATE_LIMIT_CODES = {
+    99991400,  # 应用/租户请求频率超限
+    1254290,   # 多维表格请求过于频繁
+}
+# 给出等待时间的响应头（不区分大小写）
+RETRY_AFTER_HEADERS = ('retry-after', 'x-ogw-ratelimit-reset')
+# 限流但未给出等待时间时的默认等待（秒）
+DEFAULT_RETRY_AFTER = 1.0
+# 同一请求因限流重新排队的最大次数
+MAX_THROTTLE_RETRIES = 5
+
+
+class RateLimited(Exception):
+    """请求触发飞书频率限制"""
+
+    def __init__(self, code, msg, retry_after: float):
+        super().__init__(f"{code} - {msg}")
+        self.code = code
+        self.msg = msg
+        self.retry_after = retry_after
+
+
+def _retry_after(headers) -> Optional[float]:
+    if not headers:
+        return None
+    lowered = {str(k).lower(): v for k, v in headers.items()}
+    for name in RETRY_AFTER_HEADERS:
+        value = lowered.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def check_rate_limit(response):
+    """
+    检查lark_oapi响应是否触发频率限制
+
+    Raises:
+        RateLimited: 响应为HTTP 429或限流错误码时，附带建议等待时间
+    """
+    raw = getattr(response, 'raw', None)
+    status = getattr(raw, 'status_code', None)
+    if status != 429 and response.code not in RATE_LIMIT_CODES:
+        return
+    retry_after = _retry_after(getattr(raw, 'headers', None))
+    raise RateLimited(response.code if response.code is not None else status, response.msg,
+                      DEFAULT_RETRY_AFTER if retry_after is None else retry_after)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD并发控制器
+
+    每个并发窗口内的请求都正常返回时上限加1，触发限流时上限减半并按建议时间暂停发送；
+    减半之前已发出的请求再触发限流不会重复减半
+    """
+
+    def __init__(self, initial: int = 2, minimum: int = 1, maximum: int = 4):
+        """
+        Args:
+            initial: 初始并发数
+            minimum: 最小并发数
+            maximum: 最大并发数
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        """当前允许的在途请求数"""
+        return int(self._limit)
+
+    def pause_remaining(self, now: Optional[float] = None) -> float:
+        """距离恢复发送还需等待的秒数"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._paused_until - now)
+
+    def on_success(self):
+        """请求正常返回：加法增长，每个窗口约加1"""
+        with self._lock:
+            if self._limit < self.maximum:
+                self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+
+    def on_throttle(self, retry_after: float, started_at: float):
+        """
+        请求被限流：乘法减半，并暂停发送retry_after秒
+
+        Args:
+            retry_after: 建议等待时间（秒）
+            started_at: 该请求的发出时间（time.monotonic）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + retry_after)
+            if started_at < self._last_decrease:
+                return
+            previous = self.limit
+            self._limit = max(float(self.minimum), self._limit / 2)
+            self._last_decrease = now
+            logger.warning(f"  ⏳ 触发飞书频率限制，并发数 {previous} -> {self.limit}，暂停 {retry_after:.1f} 秒")
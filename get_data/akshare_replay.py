@@ -0,0 +1,221 @@
+"""
+akshare数据源录制/回放
+- off: 直接调用akshare
+- record: 调用akshare，并把返回结果（或异常）和用时保存为夹具文件
+- replay: 不访问网络，从夹具文件返回结果，按录制用时或指定延迟等待，并可按比例注入失败
+
+通过环境变量配置：
+    AKSHARE_REPLAY=off|record|replay
+    AKSHARE_FIXTURE_DIR=夹具目录（默认 data/fixtures/akshare）
+    AKSHARE_REPLAY_LATENCY=回放延迟秒数（默认使用录制时的用时）
+    AKSHARE_REPLAY_FAILURE_RATE=注入失败的比例（0~1）
+    AKSHARE_REPLAY_SEED=失败注入的随机种子
+
+录制自选股所需的全部夹具:
+    python get_data/akshare_replay.py
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+try:
+    from .atomic_file import atomic_open
+except ImportError:
+    from atomic_file import atomic_open
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = 'off'
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+DEFAULT_FIXTURE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fixtures', 'akshare'
+)
+
+
+class FixtureMissing(Exception):
+    """回放时没有对应的夹具文件"""
+
+
+class InjectedFailure(ConnectionError):
+    """回放时按配置注入的失败"""
+
+
+def _fixture_key(kwargs: Dict[str, Any]) -> str:
+    """由调用参数生成稳定的文件名"""
+    canonical = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:12]
+    symbol = kwargs.get('symbol')
+    return f"{symbol}_{digest}" if symbol else digest
+
+
+class AkshareReplay:
+    """akshare调用的录制/回放层"""
+
+    def __init__(self, mode: str = MODE_OFF, fixture_dir: str = DEFAULT_FIXTURE_DIR,
+                 latency: Optional[float] = None, failure_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+            mode: off / record / replay
+            fixture_dir: 夹具目录
+            latency: 回放延迟（秒），None表示使用录制时的用时
+            failure_rate: 回放时注入失败的比例
+            seed: 失败注入的随机种子；同一参数的第N次调用是否失败只由种子决定，与线程调度无关
+        """
+        if mode not in (MODE_OFF, MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"未知的akshare回放模式: {mode}")
+        self.mode = mode
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.stats: Counter = Counter()
+        self._attempts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AkshareReplay":
+        latency = os.getenv('AKSHARE_REPLAY_LATENCY')
+        return cls(
+            mode=os.getenv('AKSHARE_REPLAY', MODE_OFF),
+            fixture_dir=os.getenv('AKSHARE_FIXTURE_DIR', DEFAULT_FIXTURE_DIR),
+            latency=float(latency) if latency else None,
+            failure_rate=float(os.getenv('AKSHARE_REPLAY_FAILURE_RATE', '0')),
+            seed=int(os.getenv('AKSHARE_REPLAY_SEED', '0')),
+        )
+
+    def fixture_path(self, name: str, kwargs: Dict[str, Any]) -> str:
+        return os.path.join(self.fixture_dir, name, f"{_fixture_key(kwargs)}.pkl")
+
+    def save_fixture(self, name: str, kwargs: Dict[str, Any], result: Any = None,
+                     elapsed: float = 0.0, error: Optional[BaseException] = None):
+        """保存一次调用的结果或异常"""
+        path = self.fixture_path(name, kwargs)
+        with atomic_open(path, 'wb') as f:
+            pickle.dump({
+                'name': name,
+                'kwargs': kwargs,
+                'result': result,
+                'error': None if error is None else f"{type(error).__name__}: {error}",
+                'elapsed': elapsed,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _record(self, name: str, kwargs: Dict[str, Any]):
+        import akshare as ak
+
+        start = time.monotonic()
+        try:
+            result = getattr(ak, name)(**kwargs)
+        except Exception as e:
+            self.save_fixture(name, kwargs, elapsed=time.monotonic() - start, error=e)
+            raise
+        self.save_fixture(name, kwargs, result=result, elapsed=time.monotonic() - start)
+        return result
+
+    def _should_fail(self, name: str, kwargs: Dict[str, Any]) -> bool:
+        if self.failure_rate <= 0:
+            return False
+        key = f"{name}/{_fixture_key(kwargs)}"
+        with self._lock:
+            attempt = self._attempts[key]
+            self._attempts[key] += 1
+        return random.Random(f"{self.seed}:{key}:{attempt}").random() < self.failure_rate
+
+    def _replay(self, name: str, kwargs: Dict[str, Any]):
+        path = self.fixture_path(name, kwargs)
+        if not os.path.exists(path):
+            raise FixtureMissing(f"没有夹具: {name}({kwargs}) -> {path}")
+        with open(path, 'rb') as f:
+            fixture = pickle.load(f)
+
+        time.sleep(fixture['elapsed'] if self.latency is None else self.latency)
+        if self._should_fail(name, kwargs):
+            self._count('injected_failures')
+            raise InjectedFailure(f"注入的失败: {name}({kwargs})")
+        if fixture['error']:
+            raise RuntimeError(f"录制时的异常: {fixture['error']}")
+        result = fixture['result']
+        return result.copy() if hasattr(result, 'copy') else result
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def call(self, name: str, **kwargs):
+        """调用akshare函数ak.<name>(**kwargs)"""
+        self._count(name)
+        if self.mode == MODE_REPLAY:
+            return self._replay(name, kwargs)
+        if self.mode == MODE_RECORD:
+            return self._record(name, kwargs)
+        import akshare as ak
+        return getattr(ak, name)(**kwargs)
+
+
+_default: Optional[AkshareReplay] = None
+_default_lock = threading.Lock()
+
+
+def default_replay() -> AkshareReplay:
+    """进程内共享的录制/回放层，首次使用时按环境变量创建"""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = AkshareReplay.from_env()
+                if _default.mode != MODE_OFF:
+                    logger.info(f"🎞️ akshare {_default.mode} 模式，夹具目录: {_default.fixture_dir}")
+    return _default
+
+
+def set_default_replay(replay: Optional[AkshareReplay]):
+    """替换共享的录制/回放层（基准测试用），None表示重新按环境变量创建"""
+    global _default
+    with _default_lock:
+        _default = replay
+
+
+def akshare_call(name: str, **kwargs):
+    """经由共享的录制/回放层调用ak.<name>(**kwargs)"""
+    return default_replay().call(name, **kwargs)
+
+
+def main() -> int:
+    """录制全市场快照以及自选股的个股行情和EPS预测"""
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from watchlist import load_watchlist_codes
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    watchlist_file = os.getenv(
+        'WATCHLIST_FILE',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fromyouwei.xlsx')
+    )
+    recorder = AkshareReplay(MODE_RECORD, os.getenv('AKSHARE_FIXTURE_DIR', DEFAULT_FIXTURE_DIR))
+    calls = [('stock_zh_a_spot_em', {})]
+    for code in load_watchlist_codes(watchlist_file):
+        calls.append(('stock_individual_info_em', {'symbol': code}))
+        calls.append(('stock_profit_forecast_ths', {'symbol': code, 'indicator': "预测年报每股收益"}))
+
+    failed = 0
+    for name, kwargs in calls:
+        try:
+            recorder.call(name, **kwargs)
+            logger.info(f"✅ 已录制 {name}({kwargs})")
+        except Exception as e:
+            failed += 1
+            logger.warning(f"⚠️ 录制 {name}({kwargs}) 时出错（异常也已录制）: {e}")
+    logger.info(f"📼 共录制 {len(calls)} 次调用，其中 {failed} 次出错，夹具目录: {recorder.fixture_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
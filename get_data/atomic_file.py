@@ -0,0 +1,60 @@
+"""
+原子写文件
+先写入同目录下的临时文件，再用os.replace替换目标文件，读取方不会读到写了一半的文件；
+临时文件名包含进程号和线程号，多个进程或线程同时写同一文件时互不覆盖
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+
+def _temp_path(path: str) -> str:
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+@contextmanager
+def atomic_path(path: str, permissions: Optional[int] = None) -> Iterator[str]:
+    """
+    产出临时文件路径，代码块正常结束后用其替换目标文件；代码块抛出异常时删除临时文件
+
+    Args:
+        path: 目标文件路径，所在目录不存在时自动创建
+        permissions: 替换前设置的文件权限（如0o600），None表示使用默认权限
+
+    Usage:
+        with atomic_path('data/x.parquet') as tmp_path:
+            pq.write_table(table, tmp_path)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = _temp_path(path)
+    try:
+        yield tmp_path
+        if permissions is not None:
+            os.chmod(tmp_path, permissions)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w', encoding: Optional[str] = 'utf-8',
+                permissions: Optional[int] = None) -> Iterator[IO]:
+    """
+    以原子替换方式打开文件写入
+
+    Args:
+        path: 目标文件路径
+        mode: 写入模式，'w' 或 'wb'
+        encoding: 文本模式的编码，二进制模式下忽略
+        permissions: 文件权限，None表示使用默认权限
+    """
+    with atomic_path(path, permissions) as tmp_path:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
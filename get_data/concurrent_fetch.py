@@ -0,0 +1,79 @@
+"""
+并发数据获取工具
+令牌桶限速 + 有界线程池，用于按股票逐个调用akshare接口
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        初始化限速器
+
+        Args:
+            rate: 每秒补充的令牌数（即稳定的每秒请求数），<=0表示不限速
+            capacity: 桶容量（允许的突发请求数），默认与rate相同且至少为1
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """阻塞直到取得指定数量的令牌"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_concurrently(keys: Iterable[Any], fetch_fn: Callable[[Any], Any],
+                       max_workers: int = 8, description: str = "") -> Dict[Any, Any]:
+    """
+    在有界线程池中并发调用fetch_fn
+
+    Args:
+        keys: 待获取的键（如股票代码）
+        fetch_fn: 获取函数，接收一个键并返回结果；限速与重试由调用方在fetch_fn中处理
+        max_workers: 最大同时在途请求数
+        description: 日志中的任务描述
+
+    Returns:
+        Dict[Any, Any]: 键 -> 结果，按输入顺序排列；抛出异常的键对应None
+    """
+    keys = list(dict.fromkeys(keys))
+    results: Dict[Any, Any] = {}
+    if not keys:
+        return results
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(keys)))) as executor:
+        futures = {executor.submit(fetch_fn, key): key for key in keys}
+        for done, future in enumerate(as_completed(futures), 1):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logger.error(f"❌ {description} {key} 获取异常: {e}")
+                results[key] = None
+            logger.debug(f"{description} 进度 {done}/{len(keys)}: {key}")
+
+    logger.info(f"⏱️ {description} 并发获取 {len(keys)} 项，用时 {time.monotonic() - start:.2f}秒")
+    return {key: results[key] for key in keys}
@@ -0,0 +1,156 @@
+"""
+按股票缓存的EPS预测数据
+每只股票记录获取时间，超过TTL或缺失的股票才重新获取，结果合并回同一文件；
+没有预测数据的股票记录在旁路元数据文件中，同样在TTL内不再重复获取
+"""
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    from .atomic_file import atomic_open
+    from .snapshot_io import normalize_years, read_snapshot, snapshot_source, write_snapshot
+except ImportError:
+    from atomic_file import atomic_open
+    from snapshot_io import normalize_years, read_snapshot, snapshot_source, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+CODE_COLUMN = '股票代码'
+FETCHED_AT_COLUMN = '获取时间戳'
+
+# 分析师预测按周变化，默认缓存24小时
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+class EpsStore:
+    """以股票代码为键、带获取时间戳的EPS数据存储"""
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        """
+        初始化存储
+
+        Args:
+            path: 数据文件路径
+            ttl_seconds: 单只股票数据的有效期（秒）
+        """
+        self.path = path
+        self.meta_path = f"{path}.meta.json"
+        self.ttl_seconds = ttl_seconds
+        self.df = pd.DataFrame()
+        # 数据是否读自旧CSV文件（仓库中只提交了CSV，保存时同时更新它以保留获取时间）
+        self.from_legacy_csv = False
+        # 没有预测数据的股票代码 -> 获取时间戳
+        self.empty_codes: Dict[str, float] = {}
+
+    def load(self) -> "EpsStore":
+        """
+        加载已有数据
+
+        没有获取时间的数据（旧文件或get_EPS.py早期写出的文件）视为已过期：
+        检出代码会重置文件修改时间，不能用它代替获取时间
+        """
+        source = snapshot_source(self.path)
+        if source is None:
+            return self
+        self.from_legacy_csv = not source.endswith('.parquet')
+        try:
+            df = read_snapshot(self.path)
+            if FETCHED_AT_COLUMN not in df.columns:
+                df[FETCHED_AT_COLUMN] = 0.0
+            else:
+                df[FETCHED_AT_COLUMN] = pd.to_numeric(df[FETCHED_AT_COLUMN], errors='coerce').fillna(0.0)
+            self.df = df
+        except Exception as e:
+            logger.warning(f"⚠️ 现有EPS数据文件损坏，全部重新获取: {e}")
+            self.df = pd.DataFrame()
+        self._load_meta()
+        return self
+
+    def _load_meta(self):
+        if not os.path.exists(self.meta_path):
+            return
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.empty_codes = {str(code): float(ts) for code, ts in meta.get('empty_codes', {}).items()}
+        except Exception as e:
+            logger.warning(f"⚠️ EPS元数据损坏，无预测数据的股票将重新获取: {e}")
+            self.empty_codes = {}
+
+    @property
+    def codes(self) -> List[str]:
+        if self.df.empty:
+            return []
+        return self.df[CODE_COLUMN].unique().tolist()
+
+    def stale_codes(self, codes: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """
+        返回缺失或已过期的股票代码
+
+        Args:
+            codes: 需要的股票代码
+            now: 当前时间戳，默认time.time()
+        """
+        now = time.time() if now is None else now
+        fetched_at: Dict[str, float] = {}
+        if not self.df.empty:
+            fetched_at = self.df.groupby(CODE_COLUMN)[FETCHED_AT_COLUMN].min().to_dict()
+        for code, ts in self.empty_codes.items():
+            fetched_at[code] = max(ts, fetched_at.get(code, ts))
+        return [
+            code for code in dict.fromkeys(codes)
+            if code not in fetched_at or now - fetched_at[code] > self.ttl_seconds
+        ]
+
+    def merge(self, fetched: Dict[str, pd.DataFrame], now: Optional[float] = None) -> int:
+        """
+        用新获取的数据替换对应股票的旧数据
+
+        Args:
+            fetched: 股票代码 -> 新数据；None表示获取失败，保留旧数据；
+                空数据表示该股票没有预测，保留旧数据并记录获取时间，TTL内不再获取
+
+        Returns:
+            int: 实际更新的股票数
+        """
+        now = time.time() if now is None else now
+        frames = []
+        for code, stock_df in fetched.items():
+            if stock_df is None:
+                continue
+            if stock_df.empty:
+                self.empty_codes[code] = now
+                continue
+            self.empty_codes.pop(code, None)
+            # akshare返回字符串年度，与文件中读出的数值年度统一
+            stock_df = normalize_years(stock_df.copy())
+            stock_df[CODE_COLUMN] = code
+            stock_df[FETCHED_AT_COLUMN] = now
+            frames.append(stock_df)
+
+        if not frames:
+            return 0
+
+        updated_codes = {frame[CODE_COLUMN].iat[0] for frame in frames}
+        kept = self.df[~self.df[CODE_COLUMN].isin(updated_codes)] if not self.df.empty else self.df
+        self.df = normalize_years(
+            pd.concat([frame for frame in [kept] + frames if not frame.empty], ignore_index=True)
+        )
+        return len(frames)
+
+    def save(self, csv_export: bool = False):
+        """
+        保存数据和无预测股票的记录
+
+        Args:
+            csv_export: 是否同时导出CSV；数据读自CSV时总是更新CSV
+        """
+        if not self.df.empty:
+            write_snapshot(self.df, self.path, csv_export=csv_export or self.from_legacy_csv)
+        with atomic_open(self.meta_path) as f:
+            json.dump({'empty_codes': self.empty_codes}, f)
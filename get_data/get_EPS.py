@@ -1,9 +1,18 @@
-import akshare as ak
-import pandas as pd
 import os
 import time
+from akshare_replay import akshare_call
+from concurrent_fetch import TokenBucket, fetch_concurrently
+from eps_store import EpsStore
+from watchlist import load_watchlist_codes
 
-def get_eps_data_with_retry(stock_code, max_retries=3, delay=1):
+# 每秒请求数与最大同时在途请求数
+REQUESTS_PER_SECOND = float(os.getenv('EPS_FETCH_RATE', '5'))
+MAX_IN_FLIGHT = int(os.getenv('EPS_FETCH_MAX_IN_FLIGHT', '8'))
+
+# 自选股Excel，需要获取的股票由其Ticker列决定
+WATCHLIST_FILE = os.getenv('WATCHLIST_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fromyouwei.xlsx'))
+
+def get_eps_data_with_retry(stock_code, max_retries=3, delay=1, rate_limiter=None):
     """
     带重试机制的EPS数据获取
     
@@ -11,13 +20,16 @@ def get_eps_data_with_retry(stock_code, max_retries=3, delay=1):
         stock_code: 股票代码
         max_retries: 最大重试次数
         delay: 重试间隔（秒）
+        rate_limiter: 限速器，每次请求前获取令牌
     
     Returns:
-        DataFrame: EPS预测数据
+        DataFrame: EPS预测数据（没有预测时为空），所有重试都失败时返回None
     """
     for attempt in range(max_retries):
         try:
-            stock_df = ak.stock_profit_forecast_ths(symbol=stock_code, indicator="预测年报每股收益")
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            stock_df = akshare_call('stock_profit_forecast_ths', symbol=stock_code, indicator="预测年报每股收益")
             stock_df['股票代码'] = stock_code
             return stock_df
         
@@ -28,47 +40,40 @@ def get_eps_data_with_retry(stock_code, max_retries=3, delay=1):
                 delay *= 1.5  # 轻微的指数退避
             else:
                 print(f"股票 {stock_code} 所有重试都失败了")
-                return pd.DataFrame()  # 返回空DataFrame而不是抛出异常
+                return None  # 返回None而不是抛出异常，与没有预测数据区分
 
 def main():
-    stock_list = ['002156', '002837', '300229', '600249', '002230', '688111', '603019', '300496', '600519']
+    stock_list = load_watchlist_codes(WATCHLIST_FILE)
+    print(f"📋 自选股: {len(stock_list)} 只")
     
-    # 创建一个空的DataFrame来存储所有股票的结果
-    all_stocks_esp_df = pd.DataFrame()
+    # 令牌桶限速 + 有界线程池并发获取
+    print(f"并发获取 {len(stock_list)} 只股票的EPS数据 (限速 {REQUESTS_PER_SECOND}次/秒, 并发 {MAX_IN_FLIGHT})")
+    limiter = TokenBucket(REQUESTS_PER_SECOND)
+    results = fetch_concurrently(
+        stock_list,
+        lambda stock_code: get_eps_data_with_retry(stock_code, rate_limiter=limiter),
+        max_workers=MAX_IN_FLIGHT,
+        description="EPS"
+    )
     
-    successful_count = 0
-    
-    # 遍历股票列表
-    for i, stock_code in enumerate(stock_list):
-        print(f"正在处理股票 {stock_code} ({i+1}/{len(stock_list)})...")
-        
-        try:
-            # 获取单个股票的预测年报每股收益数据
-            stock_data = get_eps_data_with_retry(stock_code)
-            
-            if not stock_data.empty:
-                # 将结果添加到总的DataFrame中
-                all_stocks_esp_df = pd.concat([all_stocks_esp_df, stock_data], ignore_index=True)
-                successful_count += 1
-                print(f"✅ 成功获取股票 {stock_code} 的预测每股收益数据")
-            else:
-                print(f"⚠️ 股票 {stock_code} 数据获取失败，跳过")
-            
-            # 添加小延迟避免请求过快
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"❌ 获取股票 {stock_code} 数据时出现异常: {e}")
+    for stock_code, stock_data in results.items():
+        if stock_data is not None and not stock_data.empty:
+            print(f"✅ 成功获取股票 {stock_code} 的预测每股收益数据")
+        elif stock_data is not None:
+            print(f"ℹ️ 股票 {stock_code} 没有预测数据")
+        else:
+            print(f"⚠️ 股票 {stock_code} 数据获取失败，跳过")
     
-    # 确保data文件夹存在
-    os.makedirs('data', exist_ok=True)
+    # 与complete_sync.py共用EpsStore，写出的文件带获取时间戳列，结构一致
+    output_path = 'data/股票代码_EPS.parquet'
+    store = EpsStore(output_path).load()
+    successful_count = store.merge(results)
     
-    # 保存结果到CSV文件
-    if not all_stocks_esp_df.empty:
-        output_path = 'data/股票代码_EPS.csv'
-        all_stocks_esp_df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    # 保存结果到Parquet和CSV文件
+    if successful_count:
+        store.save(csv_export=True)
         print(f"✅ 所有股票的预测每股收益数据已保存到: {output_path}")
-        print(f"📊 共处理了 {len(stock_list)} 只股票，成功获取 {successful_count} 只股票的数据，总计 {len(all_stocks_esp_df)} 条记录")
+        print(f"📊 共处理了 {len(stock_list)} 只股票，成功获取 {successful_count} 只股票的数据，总计 {len(store.df)} 条记录")
     else:
         print("❌ 没有获取到任何EPS数据")
         raise Exception("EPS数据获取完全失败")
@@ -1,6 +1,11 @@
-import akshare as ak
 import time
 import os
+from akshare_replay import akshare_call
+from snapshot_io import write_snapshot
+from watchlist import load_watchlist_codes
+
+# 自选股Excel，只保存其中股票的行情
+WATCHLIST_FILE = os.getenv('WATCHLIST_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fromyouwei.xlsx'))
 
 def get_stock_price_data_with_retry(max_retries=3, delay=2):
     """
@@ -16,7 +21,7 @@ def get_stock_price_data_with_retry(max_retries=3, delay=2):
     for attempt in range(max_retries):
         try:
             print(f"尝试获取股票数据 (第{attempt + 1}/{max_retries}次)...")
-            stock_df = ak.stock_zh_a_spot_em()
+            stock_df = akshare_call('stock_zh_a_spot_em')
             print(f"成功获取{len(stock_df)}条股票数据")
             return stock_df
         
@@ -36,11 +41,16 @@ def main():
         os.makedirs('data', exist_ok=True)
         
         # 获取数据
+        codes = load_watchlist_codes(WATCHLIST_FILE)
         stock_zh_a_spot_em_df = get_stock_price_data_with_retry()
+        stock_zh_a_spot_em_df = stock_zh_a_spot_em_df[
+            stock_zh_a_spot_em_df['代码'].astype(str).str.zfill(6).isin(codes)
+        ]
+        print(f"自选股 {len(codes)} 只，保留 {len(stock_zh_a_spot_em_df)} 条行情")
         
         # 保存数据
-        output_path = 'data/all_stock_price.csv'
-        stock_zh_a_spot_em_df.to_csv(output_path, index=False)
+        output_path = 'data/all_stock_price.parquet'
+        write_snapshot(stock_zh_a_spot_em_df, output_path, csv_export=True)
         print(f"股票价格数据已保存到: {output_path}")
         
     except Exception as e:
@@ -0,0 +1,153 @@
+"""
+感知A股交易时段的价格快照缓存
+交易时段内行情持续变化，快照视为过期；收盘后到下一次开盘前行情不变，快照保持有效
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+
+try:
+    from .atomic_file import atomic_open
+except ImportError:
+    from atomic_file import atomic_open
+
+logger = logging.getLogger(__name__)
+
+BEIJING_TZ = timezone(timedelta(hours=8))
+
+# A股连续竞价时段（北京时间）
+TRADING_SESSIONS = [
+    ((9, 30), (11, 30)),
+    ((13, 0), (15, 0)),
+]
+
+
+def _to_beijing(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, BEIJING_TZ)
+
+
+def in_trading_session(now: Optional[float] = None) -> bool:
+    """当前是否处于交易时段（仅按工作日判断，不含节假日）"""
+    dt = _to_beijing(time.time() if now is None else now)
+    if dt.weekday() >= 5:
+        return False
+    for (start_h, start_m), (end_h, end_m) in TRADING_SESSIONS:
+        start = dt.replace(hour=start_h, minute=start_m, second=0, microsecond=0)
+        end = dt.replace(hour=end_h, minute=end_m, second=0, microsecond=0)
+        if start <= dt < end:
+            return True
+    return False
+
+
+def last_session_end(now: Optional[float] = None) -> float:
+    """返回now之前最近一个交易时段的结束时间戳"""
+    dt = _to_beijing(time.time() if now is None else now)
+    for days_back in range(0, 8):
+        day = dt - timedelta(days=days_back)
+        if day.weekday() >= 5:
+            continue
+        for _, (end_h, end_m) in reversed(TRADING_SESSIONS):
+            end = day.replace(hour=end_h, minute=end_m, second=0, microsecond=0)
+            if end <= dt:
+                return end.timestamp()
+    return 0.0
+
+
+def next_session_start(now: Optional[float] = None) -> float:
+    """返回now之后（含now）最近一个交易时段的开始时间戳；处于交易时段内时返回now"""
+    now = time.time() if now is None else now
+    if in_trading_session(now):
+        return now
+    dt = _to_beijing(now)
+    for days_ahead in range(0, 8):
+        day = dt + timedelta(days=days_ahead)
+        if day.weekday() >= 5:
+            continue
+        for (start_h, start_m), _ in TRADING_SESSIONS:
+            start = day.replace(hour=start_h, minute=start_m, second=0, microsecond=0)
+            if start > dt:
+                return start.timestamp()
+    return now
+
+
+class PriceSnapshotCache:
+    """带获取时间的价格快照，获取时间记录在旁路元数据文件中"""
+
+    def __init__(self, path: str, intraday_max_age: float = 0):
+        """
+        初始化缓存
+
+        Args:
+            path: 快照数据文件路径
+            intraday_max_age: 交易时段内快照的最长可用时间（秒），0表示交易时段内总是重新获取
+        """
+        self.path = path
+        self.meta_path = f"{path}.meta.json"
+        self.intraday_max_age = intraday_max_age
+
+    def _load_meta(self) -> Optional[dict]:
+        if not (os.path.exists(self.path) and os.path.exists(self.meta_path)):
+            return None
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            meta['fetched_at'] = float(meta['fetched_at'])
+            return meta
+        except Exception as e:
+            logger.warning(f"⚠️ 价格快照元数据损坏: {e}")
+            return None
+
+    @property
+    def fetched_at(self) -> Optional[float]:
+        """快照获取时间戳；没有元数据（如旧文件或仓库检出的文件）时返回None"""
+        meta = self._load_meta()
+        return meta['fetched_at'] if meta else None
+
+    def missing_codes(self, codes: Iterable[str]) -> List[str]:
+        """返回快照获取时未包含的股票代码；全市场快照包含全部代码"""
+        meta = self._load_meta()
+        if meta is None:
+            return list(codes)
+        if meta.get('codes') is None:
+            return []
+        covered = set(meta['codes'])
+        return [code for code in codes if code not in covered]
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """
+        判断快照是否仍然有效
+
+        - 交易时段内：快照年龄不超过intraday_max_age才有效
+        - 非交易时段：快照获取于最近一次收盘之后才有效
+        """
+        fetched_at = self.fetched_at
+        if fetched_at is None:
+            return False
+        now = time.time() if now is None else now
+        if in_trading_session(now):
+            return now - fetched_at <= self.intraday_max_age
+        return fetched_at >= last_session_end(now)
+
+    def describe(self) -> str:
+        fetched_at = self.fetched_at
+        if fetched_at is None:
+            return "无获取时间记录"
+        return f"获取于 {_to_beijing(fetched_at).strftime('%Y-%m-%d %H:%M:%S CST')}"
+
+    def mark_fetched(self, fetched_at: Optional[float] = None, codes: Optional[Iterable[str]] = None):
+        """
+        在快照写入后记录获取时间
+
+        Args:
+            fetched_at: 获取时间戳，默认当前时间
+            codes: 快照所针对的股票代码，None表示全市场
+        """
+        meta = {
+            'fetched_at': time.time() if fetched_at is None else fetched_at,
+            'codes': None if codes is None else sorted(set(codes)),
+        }
+        with atomic_open(self.meta_path) as f:
+            json.dump(meta, f)
@@ -0,0 +1,213 @@
+"""
+自适应行情来源
+自选股较少时逐只并发获取行情，较多或预计更慢时获取全市场快照；
+两种方式的实测延迟保存在本地，用于估算下一次的用时
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    from .concurrent_fetch import TokenBucket, fetch_concurrently
+except ImportError:
+    from concurrent_fetch import TokenBucket, fetch_concurrently
+
+logger = logging.getLogger(__name__)
+
+SOURCE_PER_TICKER = 'per_ticker'
+SOURCE_SNAPSHOT = 'snapshot'
+
+# 没有实测数据时的默认延迟估计（秒）
+DEFAULT_LATENCY = {
+    SOURCE_PER_TICKER: 0.5,
+    SOURCE_SNAPSHOT: 20.0,
+}
+# 延迟的指数移动平均系数
+LATENCY_EWMA_ALPHA = 0.3
+
+# 行情快照统一输出的列
+QUOTE_COLUMNS = ['代码', '名称', '最新价', '总市值']
+
+
+class LatencyStats:
+    """行情来源的实测延迟（指数移动平均），持久化到JSON文件"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.latency: Dict[str, float] = dict(DEFAULT_LATENCY)
+        self.measured: Dict[str, bool] = {source: False for source in DEFAULT_LATENCY}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                for source, value in saved.items():
+                    if source in self.latency:
+                        self.latency[source] = float(value)
+                        self.measured[source] = True
+            except Exception as e:
+                logger.warning(f"⚠️ 行情延迟统计文件损坏，使用默认值: {e}")
+
+    def record(self, source: str, seconds: float):
+        with self._lock:
+            if self.measured.get(source):
+                self.latency[source] = (1 - LATENCY_EWMA_ALPHA) * self.latency[source] + LATENCY_EWMA_ALPHA * seconds
+            else:
+                self.latency[source] = seconds
+                self.measured[source] = True
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({s: v for s, v in self.latency.items() if self.measured[s]}, f)
+
+
+class _WaitTrackingLimiter:
+    """包装限速器，按线程累计等待令牌的时间，使延迟统计不包含限速等待"""
+
+    def __init__(self, limiter: TokenBucket):
+        self.limiter = limiter
+        self._local = threading.local()
+
+    def acquire(self, tokens: float = 1.0):
+        start = time.monotonic()
+        self.limiter.acquire(tokens)
+        self._local.waited = self.waited + time.monotonic() - start
+
+    @property
+    def waited(self) -> float:
+        return getattr(self._local, 'waited', 0.0)
+
+    def reset(self):
+        self._local.waited = 0.0
+
+
+class QuoteProvider:
+    """在逐只获取和全市场快照之间选择行情来源"""
+
+    def __init__(self, per_ticker_fn: Callable[..., Optional[dict]], snapshot_fn: Callable[[], pd.DataFrame],
+                 max_per_ticker: int = 50, rate: float = 5, max_in_flight: int = 8,
+                 stats_path: Optional[str] = None):
+        """
+        初始化行情来源
+
+        Args:
+            per_ticker_fn: 单只股票行情获取函数 fn(code, rate_limiter=...) -> {'代码','名称','最新价','总市值'}，失败返回None
+            snapshot_fn: 全市场快照获取函数（如get_stock_price_data_with_retry）
+            max_per_ticker: 自选股数量超过该阈值时总是使用全市场快照
+            rate: 逐只获取时每秒请求数
+            max_in_flight: 逐只获取时最大同时在途请求数
+            stats_path: 延迟统计文件路径
+        """
+        self.per_ticker_fn = per_ticker_fn
+        self.snapshot_fn = snapshot_fn
+        self.max_per_ticker = max_per_ticker
+        self.rate = rate
+        self.max_in_flight = max(1, max_in_flight)
+        self.stats = LatencyStats(stats_path)
+        # 最近一次fetch中因全市场快照补齐失败而没有取到的股票
+        self.unresolved: List[str] = []
+
+    def estimate(self, count: int) -> Dict[str, float]:
+        """估算两种来源获取count只股票的用时（秒）"""
+        per_call = self.stats.latency[SOURCE_PER_TICKER]
+        per_ticker = math.ceil(count / self.max_in_flight) * per_call
+        if self.rate > 0:
+            per_ticker = max(per_ticker, count / self.rate)
+        return {
+            SOURCE_PER_TICKER: per_ticker,
+            SOURCE_SNAPSHOT: self.stats.latency[SOURCE_SNAPSHOT],
+        }
+
+    def choose(self, count: int) -> str:
+        """根据数量阈值和估算用时选择来源"""
+        estimates = self.estimate(count)
+        if count > self.max_per_ticker:
+            source = SOURCE_SNAPSHOT
+            reason = f"自选股 {count} 只超过阈值 {self.max_per_ticker}"
+        elif estimates[SOURCE_PER_TICKER] <= estimates[SOURCE_SNAPSHOT]:
+            source = SOURCE_PER_TICKER
+            reason = "预计逐只获取更快"
+        else:
+            source = SOURCE_SNAPSHOT
+            reason = "预计全市场快照更快"
+        logger.info(
+            f"📡 行情来源: {source} ({reason}; 阈值 {self.max_per_ticker} 只, "
+            f"预计逐只 {estimates[SOURCE_PER_TICKER]:.1f}秒 / 快照 {estimates[SOURCE_SNAPSHOT]:.1f}秒)"
+        )
+        return source
+
+    def _timed_per_ticker(self, code: str, limiter: _WaitTrackingLimiter) -> Optional[dict]:
+        limiter.reset()
+        start = time.monotonic()
+        quote = self.per_ticker_fn(code, rate_limiter=limiter)
+        if quote is not None:
+            self.stats.record(SOURCE_PER_TICKER, time.monotonic() - start - limiter.waited)
+        return quote
+
+    def _fetch_per_ticker(self, codes: List[str]) -> pd.DataFrame:
+        limiter = _WaitTrackingLimiter(TokenBucket(self.rate))
+        results = fetch_concurrently(
+            codes,
+            lambda code: self._timed_per_ticker(code, limiter),
+            max_workers=self.max_in_flight,
+            description="行情"
+        )
+        rows = [quote for quote in results.values() if quote is not None]
+        return pd.DataFrame(rows, columns=QUOTE_COLUMNS)
+
+    def _fetch_snapshot(self, codes: List[str]) -> pd.DataFrame:
+        start = time.monotonic()
+        market_df = self.snapshot_fn()
+        self.stats.record(SOURCE_SNAPSHOT, time.monotonic() - start)
+        market_codes = market_df['代码'].astype(str).str.zfill(6)
+        return market_df[market_codes.isin(codes)].assign(代码=market_codes)
+
+    def fetch(self, codes: List[str]) -> pd.DataFrame:
+        """
+        获取自选股行情
+
+        逐只获取有失败时，用全市场快照补齐缺失的股票；补齐也失败时返回已获取的部分，
+        未取到的股票记录在unresolved中
+
+        Returns:
+            pd.DataFrame: 至少包含 代码/名称/最新价/总市值 列
+
+        Raises:
+            Exception: 全市场快照获取失败且没有任何逐只获取的结果时
+        """
+        self.unresolved = []
+        source = self.choose(len(codes))
+        try:
+            if source == SOURCE_PER_TICKER:
+                quote_df = self._fetch_per_ticker(codes)
+                missing = sorted(set(codes) - set(quote_df['代码']))
+                if missing:
+                    logger.warning(f"⚠️ 逐只获取失败 {len(missing)} 只，使用全市场快照补齐")
+                    try:
+                        quote_df = pd.concat([quote_df, self._fetch_snapshot(missing)[QUOTE_COLUMNS]],
+                                             ignore_index=True)
+                    except Exception as e:
+                        if quote_df.empty:
+                            raise
+                        self.unresolved = missing
+                        logger.warning(f"⚠️ 全市场快照补齐失败，返回已获取的 {len(quote_df)} 只，"
+                                       f"缺少 {len(missing)} 只: {e}")
+            else:
+                quote_df = self._fetch_snapshot(codes)
+        finally:
+            try:
+                self.stats.save()
+            except Exception as e:
+                logger.warning(f"⚠️ 保存行情延迟统计失败: {e}")
+        return quote_df
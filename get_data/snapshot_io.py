@@ -0,0 +1,139 @@
+"""
+列式快照读写
+价格与EPS数据以Parquet保存，列类型显式指定，股票代码列以6字节定长存储，读取时可只加载需要的列
+"""
+import os
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pandas.api import types as ptypes
+
+try:
+    from .atomic_file import atomic_path
+except ImportError:
+    from atomic_file import atomic_path
+
+# 股票代码列，统一存为6位定长
+CODE_COLUMNS = ('代码', '股票代码')
+CODE_WIDTH = 6
+# 年度列，akshare返回字符串，统一存为整数
+YEAR_COLUMNS = ('年度',)
+
+
+def _year_values(series: pd.Series) -> pd.Series:
+    """年度转为NumPy数值：全部可解析时为int64，否则为float64（无法解析的值为NaN）"""
+    values = pd.to_numeric(series, errors='coerce')
+    if ptypes.is_extension_array_dtype(values.dtype):
+        # 字符串扩展类型解析后为可空整数/浮点，转回NumPy类型以免比较结果中出现NA
+        values = values.astype('float64')
+    if values.notna().all() and ptypes.is_float_dtype(values.dtype) and (values % 1 == 0).all():
+        values = values.astype('int64')
+    return values
+
+
+def normalize_years(df: pd.DataFrame) -> pd.DataFrame:
+    """将年度列就地转为数值，返回同一数据框"""
+    for col in YEAR_COLUMNS:
+        if col in df.columns and not (ptypes.is_numeric_dtype(df[col])
+                                      and not ptypes.is_extension_array_dtype(df[col].dtype)):
+            df[col] = _year_values(df[col])
+    return df
+
+
+def _column_to_array(name: str, series: pd.Series) -> pa.Array:
+    """按列确定Arrow类型"""
+    if name in CODE_COLUMNS:
+        codes = series.astype(str).str.zfill(CODE_WIDTH).str.encode('ascii')
+        return pa.array(codes, type=pa.binary(CODE_WIDTH))
+    if name in YEAR_COLUMNS:
+        series = _year_values(series)
+    if ptypes.is_bool_dtype(series):
+        return pa.array(series, type=pa.bool_())
+    if ptypes.is_integer_dtype(series):
+        return pa.array(series, type=pa.int64())
+    if ptypes.is_numeric_dtype(series):
+        return pa.array(series, type=pa.float64(), from_pandas=True)
+    try:
+        return pa.array(series, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # 混合类型的列逐个转为字符串
+        return pa.array([None if pd.isna(v) else str(v) for v in series], type=pa.string())
+
+
+def _legacy_csv_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.csv'
+
+
+def snapshot_source(path: str) -> Optional[str]:
+    """
+    返回实际存在的快照文件路径
+
+    优先使用Parquet文件，不存在时回退到同名的旧CSV文件
+
+    Returns:
+        Optional[str]: 文件路径，均不存在时返回None
+    """
+    if os.path.exists(path):
+        return path
+    legacy = _legacy_csv_path(path)
+    if legacy != path and os.path.exists(legacy):
+        return legacy
+    return None
+
+
+def write_snapshot(df: pd.DataFrame, path: str, csv_export: bool = False):
+    """
+    将DataFrame写为Parquet快照
+
+    Args:
+        df: 数据
+        path: Parquet文件路径
+        csv_export: 是否同时导出同名CSV文件（便于人工查看）
+    """
+    columns = [str(col) for col in df.columns]
+    table = pa.Table.from_arrays(
+        [_column_to_array(name, df[col]) for name, col in zip(columns, df.columns)],
+        names=columns
+    )
+    with atomic_path(path) as tmp_path:
+        pq.write_table(table, tmp_path, compression='zstd')
+
+    if csv_export:
+        with atomic_path(_legacy_csv_path(path)) as tmp_path:
+            df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+
+
+def read_snapshot(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    读取快照，只加载指定的列
+
+    Args:
+        path: Parquet文件路径；不存在时回退读取同名CSV
+        columns: 需要的列，None表示全部列
+
+    Returns:
+        pd.DataFrame: 数据，股票代码列为6位字符串，年度列为数值
+
+    Raises:
+        FileNotFoundError: 快照文件不存在时
+    """
+    source = snapshot_source(path)
+    if source is None:
+        raise FileNotFoundError(f"快照文件不存在: {path}")
+
+    if source.endswith('.parquet'):
+        table = pq.read_table(source, columns=columns)
+        for i, name in enumerate(table.column_names):
+            if name in CODE_COLUMNS:
+                table = table.set_column(i, name, pc.cast(table.column(i), pa.string()))
+        # 旧快照中的年度列可能仍为字符串
+        return normalize_years(table.to_pandas())
+
+    df = pd.read_csv(source, usecols=columns, dtype={col: str for col in CODE_COLUMNS})
+    for col in CODE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].str.zfill(CODE_WIDTH)
+    return normalize_years(df)
@@ -0,0 +1,127 @@
+"""
+自选股列表
+从fromyouwei.xlsx的Ticker列得到需要获取数据的股票代码
+
+解析后的表格按 文件路径+修改时间+大小 缓存在工作簿旁的二进制文件中，
+文件未变化时直接读取缓存，跳过Excel解析
+"""
+import logging
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    from .atomic_file import atomic_open
+except ImportError:
+    from atomic_file import atomic_open
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，缓存内容结构变化时递增
+WATCHLIST_CACHE_VERSION = 1
+
+_cache_lock = threading.Lock()
+# 进程内缓存: 绝对路径 -> (缓存键, 数据)
+_memory_cache: Dict[str, Tuple[tuple, pd.DataFrame]] = {}
+
+
+def normalize_ticker(tickers: pd.Series) -> pd.Series:
+    """将Ticker列规范为6位股票代码，如 '002156.SZ' -> '002156'"""
+    return tickers.astype(str).str[:6]
+
+
+def _excel_engine() -> Optional[str]:
+    """安装了python-calamine且pandas支持时（2.2起）使用calamine引擎，否则使用pandas默认引擎(openpyxl)"""
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return None
+    major, minor = (int(part) for part in pd.__version__.split('.')[:2])
+    if (major, minor) < (2, 2):
+        return None
+    return 'calamine'
+
+
+def _cache_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.cache.pkl")
+
+
+def _load_cache(cache_path: str, key: tuple) -> Optional[pd.DataFrame]:
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_key, df = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ 自选股缓存损坏，重新解析Excel: {e}")
+        return None
+    return df if cached_key == key else None
+
+
+def _save_cache(cache_path: str, key: tuple, df: pd.DataFrame):
+    try:
+        with atomic_open(cache_path, 'wb') as f:
+            pickle.dump((key, df), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.warning(f"⚠️ 保存自选股缓存失败: {e}")
+
+
+def read_watchlist(path: str, use_cache: bool = True) -> pd.DataFrame:
+    """
+    读取自选股Excel
+
+    Args:
+        path: Excel文件路径
+        use_cache: 文件未变化时使用缓存的解析结果
+
+    Returns:
+        pd.DataFrame: 表格数据（每次返回独立副本）
+    """
+    if not use_cache:
+        return pd.read_excel(path, engine=_excel_engine())
+
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    key = (WATCHLIST_CACHE_VERSION, abs_path, stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _memory_cache.get(abs_path)
+        if cached is not None and cached[0] == key:
+            return cached[1].copy()
+
+        cache_path = _cache_path(abs_path)
+        df = _load_cache(cache_path, key)
+        if df is None:
+            engine = _excel_engine()
+            df = pd.read_excel(abs_path, engine=engine)
+            logger.debug(f"解析Excel {path} (引擎 {engine or 'openpyxl'}): {len(df)} 行")
+            _save_cache(cache_path, key, df)
+        _memory_cache[abs_path] = (key, df)
+        return df.copy()
+
+
+def watchlist_codes(df: pd.DataFrame) -> List[str]:
+    """
+    提取自选股的股票代码
+
+    Args:
+        df: 自选股数据，需包含Ticker列
+
+    Returns:
+        List[str]: 去重后的6位股票代码，保持原顺序；跳过空值和非数字代码
+    """
+    codes = normalize_ticker(df['Ticker'].dropna())
+    valid = codes.str.fullmatch(r'\d{6}')
+    invalid = codes[~valid].tolist()
+    if invalid:
+        logger.warning(f"⚠️ 忽略无效的Ticker: {', '.join(invalid)}")
+    return list(dict.fromkeys(codes[valid].tolist()))
+
+
+def load_watchlist_codes(path: str) -> List[str]:
+    """读取自选股Excel并返回股票代码"""
+    return watchlist_codes(read_watchlist(path))
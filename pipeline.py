@@ -0,0 +1,196 @@
+"""
+进程内DAG流水线
+按步骤声明的依赖关系调度执行：互不依赖的步骤并发运行，上游结果直接在内存中传给下游，
+结束后报告各步骤用时和关键路径
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+
+class Step:
+    """流水线中的一个步骤"""
+
+    def __init__(self, name: str, fn: Callable[..., Any], deps: Iterable[str] = (),
+                 inputs: Optional[Dict[str, str]] = None, description: str = ""):
+        """
+        Args:
+            name: 步骤名
+            fn: 步骤函数，返回False或抛出异常表示失败，其他返回值作为该步骤的结果
+            deps: 需要先完成的步骤名
+            inputs: {上游步骤名: 参数名}，上游结果以关键字参数传入fn；其中的步骤自动加入deps
+            description: 日志中显示的描述
+        """
+        self.name = name
+        self.fn = fn
+        self.inputs = dict(inputs or {})
+        self.deps = list(dict.fromkeys(list(deps) + list(self.inputs)))
+        self.description = description or name
+
+
+class StepTiming:
+    """单个步骤的执行记录"""
+
+    def __init__(self, name: str, status: str, start: float = 0.0, end: float = 0.0):
+        self.name = name
+        self.status = status
+        self.start = start
+        self.end = end
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class PipelineResult:
+    """流水线执行结果"""
+
+    def __init__(self, steps: List[Step]):
+        self.steps = steps
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, StepTiming] = {}
+        self.total_seconds = 0.0
+
+    @property
+    def success(self) -> bool:
+        return all(
+            name in self.timings and self.timings[name].status == STATUS_OK
+            for name in (step.name for step in self.steps)
+        )
+
+    @property
+    def failed(self) -> List[str]:
+        return [name for name, timing in self.timings.items() if timing.status == STATUS_FAILED]
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        计算关键路径：沿依赖关系累计用时最长的一条步骤链
+
+        Returns:
+            (步骤名列表, 累计用时秒数)
+        """
+        finish: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for step in self.steps:
+            timing = self.timings.get(step.name)
+            duration = timing.duration if timing else 0.0
+            upstream = max(step.deps, key=lambda d: finish.get(d, 0.0), default=None)
+            finish[step.name] = duration + (finish.get(upstream, 0.0) if upstream else 0.0)
+            previous[step.name] = upstream
+        if not finish:
+            return [], 0.0
+        name = max(finish, key=finish.get)
+        length = finish[name]
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return list(reversed(path)), length
+
+    def log_report(self):
+        """输出各步骤用时和关键路径"""
+        logger.info("⏱️ 步骤用时:")
+        for step in self.steps:
+            timing = self.timings.get(step.name)
+            if timing is None or timing.status == STATUS_SKIPPED:
+                logger.info(f"  - {step.description}: 未执行")
+                continue
+            mark = "✅" if timing.status == STATUS_OK else "❌"
+            logger.info(f"  {mark} {step.description}: {timing.duration:.2f}秒")
+        path, length = self.critical_path()
+        busy = sum(t.duration for t in self.timings.values())
+        logger.info(f"🧭 关键路径: {' -> '.join(path)} ({length:.2f}秒)")
+        logger.info(f"⏱️ 实际总用时 {self.total_seconds:.2f}秒，步骤累计用时 {busy:.2f}秒")
+
+
+def _topological_order(steps: List[Step]) -> List[Step]:
+    by_name = {step.name: step for step in steps}
+    if len(by_name) != len(steps):
+        raise ValueError("流水线中存在重名步骤")
+    ordered: List[Step] = []
+    state: Dict[str, int] = {}
+
+    def visit(name: str, chain: List[str]):
+        if name not in by_name:
+            raise ValueError(f"步骤 {chain[-1]} 依赖不存在的步骤 {name}")
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"步骤依赖存在环: {' -> '.join(chain + [name])}")
+        state[name] = 1
+        for dep in by_name[name].deps:
+            visit(dep, chain + [name])
+        state[name] = 2
+        ordered.append(by_name[name])
+
+    for step in steps:
+        visit(step.name, [])
+    return ordered
+
+
+def _run_step(step: Step, kwargs: Dict[str, Any]):
+    start = time.monotonic()
+    try:
+        result = step.fn(**kwargs)
+        status = STATUS_FAILED if result is False else STATUS_OK
+    except Exception as e:
+        logger.error(f"❌ {step.description} 异常: {str(e)}")
+        result = None
+        status = STATUS_FAILED
+    return result, StepTiming(step.name, status, start, time.monotonic())
+
+
+def run_pipeline(steps: List[Step], max_workers: Optional[int] = None) -> PipelineResult:
+    """
+    执行流水线
+
+    依赖全部成功的步骤立即开始执行；任一步骤失败后不再启动新步骤，
+    已在运行的步骤执行完毕后返回
+
+    Args:
+        steps: 步骤列表
+        max_workers: 最多同时运行的步骤数，默认为步骤数
+
+    Returns:
+        PipelineResult: 各步骤结果、用时和整体是否成功
+    """
+    steps = _topological_order(steps)
+    outcome = PipelineResult(steps)
+    pending = list(steps)
+    running = {}
+    aborted = False
+    pipeline_start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(steps))) as executor:
+        while pending or running:
+            if not aborted:
+                for step in list(pending):
+                    if all(outcome.timings.get(d) and outcome.timings[d].status == STATUS_OK for d in step.deps):
+                        pending.remove(step)
+                        kwargs = {arg: outcome.results[dep] for dep, arg in step.inputs.items()}
+                        running[executor.submit(_run_step, step, kwargs)] = step
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                result, timing = future.result()
+                outcome.timings[step.name] = timing
+                if timing.status == STATUS_OK:
+                    outcome.results[step.name] = result
+                else:
+                    logger.error(f"{step.description}失败，终止流程")
+                    aborted = True
+
+    for step in pending:
+        outcome.timings[step.name] = StepTiming(step.name, STATUS_SKIPPED)
+    outcome.total_seconds = time.monotonic() - pipeline_start
+    return outcome
@@ -0,0 +1,150 @@
+"""
+流水线步骤性能剖析（complete_sync.py --profile）
+每个步骤在CPU剖析器（安装了pyinstrument时使用采样剖析，否则使用cProfile）和tracemalloc下运行，
+每个步骤输出剖析文件，并在日志中列出最耗时的函数和分配内存最多的代码行
+
+剖析模式下流水线的步骤依次执行，各步骤的CPU和内存数据互不干扰；
+只有传入--profile时才导入本模块，未开启时没有任何额外开销
+
+注意：CPU剖析只覆盖步骤所在线程，步骤内部线程池中的工作（如EPS并发获取）只体现为等待时间
+"""
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc记录的调用栈深度；按代码行汇总只需要1层，层数越多开销越大
+TRACEMALLOC_FRAMES = 1
+# 内存剖析文件中保留的代码行数
+ALLOC_FILE_LINES = 1000
+
+
+def _sampling_profiler_class():
+    """pyinstrument可用时返回其Profiler类，否则返回None"""
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return None
+    return Profiler
+
+
+class StepProfiler:
+    """为流水线步骤加上CPU和内存剖析"""
+
+    def __init__(self, output_dir: str, top_n: int = 15, sampling: bool = True):
+        """
+        Args:
+            output_dir: 剖析文件输出目录
+            top_n: 日志中列出的热点函数和内存分配条数
+            sampling: 是否优先使用采样剖析器（pyinstrument）
+        """
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.sampler = _sampling_profiler_class() if sampling else None
+        # (步骤名, 用时, 内存峰值)
+        self.summary: List[Tuple[str, float, int]] = []
+
+    def start(self):
+        """开始一次剖析运行"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        engine = "pyinstrument 采样" if self.sampler else "cProfile"
+        logger.info(f"🔬 性能剖析已开启 ({engine} + tracemalloc)，步骤依次执行，输出目录: {self.output_dir}")
+
+    def stop(self):
+        """结束剖析运行，按用时列出各步骤"""
+        if not self.summary:
+            return
+        logger.info("🔬 剖析汇总 (按用时):")
+        for name, elapsed, peak in sorted(self.summary, key=lambda item: item[1], reverse=True):
+            logger.info(f"  {name}: {elapsed:.2f}秒，内存峰值 {peak / 1024 / 1024:.1f} MB")
+
+    def wrap_steps(self, steps: List[Any]) -> List[Any]:
+        """将流水线中每个步骤的函数替换为剖析版本"""
+        for step in steps:
+            step.fn = self.wrap(step.name, step.fn)
+        return steps
+
+    def wrap(self, name: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            return self.run(name, fn, *args, **kwargs)
+        return profiled
+
+    def run(self, name: str, fn: Callable[..., Any], *args, **kwargs):
+        """在剖析器下运行fn，结束后写出剖析文件并在日志中汇总"""
+        # 每个步骤单独开启tracemalloc，快照中只有本步骤分配且仍存活的内存
+        owns_tracing = not tracemalloc.is_tracing()
+        if owns_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        cpu = self._start_cpu(name)
+        start = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - start
+            # 先取内存快照，避免计入生成CPU剖析报告时的分配
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if owns_tracing:
+                tracemalloc.stop()
+            report = io.StringIO()
+            self._stop_cpu(name, cpu, report)
+            self._report_allocations(name, snapshot, current, peak, report)
+            self.summary.append((name, elapsed, peak))
+            logger.info(f"🔬 步骤 {name} 剖析 ({elapsed:.2f}秒):\n{report.getvalue().rstrip()}")
+
+    def _start_cpu(self, name: str):
+        if self.sampler is not None:
+            try:
+                profiler = self.sampler(async_mode='disabled')
+                profiler.start()
+                return profiler
+            except Exception as e:
+                logger.warning(f"⚠️ 步骤 {name} 无法启动采样剖析器，改用cProfile: {e}")
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python 3.12起同一时间只能有一个剖析器处于开启状态
+            logger.warning(f"⚠️ 步骤 {name} 无法启动cProfile，跳过CPU剖析: {e}")
+            return None
+        return profiler
+
+    def _stop_cpu(self, name: str, profiler, report: io.StringIO):
+        if profiler is None:
+            return
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = os.path.join(self.output_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            report.write(f"CPU (cProfile，按累计用时前{self.top_n}) -> {path}\n")
+            stats = pstats.Stats(profiler, stream=report)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+            return
+        profiler.stop()
+        path = os.path.join(self.output_dir, f"{name}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+        report.write(f"CPU (pyinstrument) -> {path}\n")
+        report.write(profiler.output_text(unicode=True, color=False))
+
+    def _report_allocations(self, name: str, snapshot, current: int, peak: int, report: io.StringIO):
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, cProfile, pstats)
+        ])
+        statistics = snapshot.statistics('lineno')
+        path = os.path.join(self.output_dir, f"{name}.alloc.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stat in statistics[:ALLOC_FILE_LINES]:
+                f.write(f"{stat}\n")
+        report.write(f"内存 (存活 {current / 1024 / 1024:.1f} MB，峰值 {peak / 1024 / 1024:.1f} MB，"
+                     f"分配最多的前{self.top_n}行) -> {path}\n")
+        for stat in statistics[:self.top_n]:
+            report.write(f"  {stat}\n")
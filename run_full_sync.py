@@ -2,65 +2,17 @@
 """
 完整的股票数据同步脚本
 执行顺序：数据获取 -> 数据处理 -> 飞书同步
+各步骤在同一进程内按依赖关系调度，价格与EPS并发获取
 """
 import sys
-import subprocess
 from datetime import datetime
 import logging
 
-# 设置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('full_sync.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
-
+# 设置日志：与complete_sync共用同一套配置，流程日志同时写入 complete_sync.log 和 full_sync.log
+from complete_sync import setup_logging
 
-def run_command(command, description, cwd=None):
-    """
-    执行shell命令
-    
-    Args:
-        command: 要执行的命令
-        description: 命令描述
-        cwd: 工作目录
-        
-    Returns:
-        bool: 是否成功
-    """
-    logger.info(f"开始执行: {description}")
-    logger.info(f"命令: {command}")
-    
-    try:
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            cwd=cwd,
-            capture_output=True, 
-            text=True, 
-            timeout=300  # 5分钟超时
-        )
-        
-        if result.returncode == 0:
-            logger.info(f"✅ {description} 成功")
-            if result.stdout:
-                logger.info(f"输出: {result.stdout}")
-            return True
-        else:
-            logger.error(f"❌ {description} 失败")
-            logger.error(f"错误: {result.stderr}")
-            return False
-            
-    except subprocess.TimeoutExpired:
-        logger.error(f"❌ {description} 超时")
-        return False
-    except Exception as e:
-        logger.error(f"❌ {description} 异常: {str(e)}")
-        return False
+setup_logging('full_sync.log')
+logger = logging.getLogger(__name__)
 
 
 def check_dependencies():
@@ -90,7 +42,6 @@ def main():
     logger.info("=" * 50)
     
     success_steps = 0
-    total_steps = 5
     
     try:
         # 步骤1: 检查依赖
@@ -100,32 +51,20 @@ def main():
             logger.error("依赖检查失败，退出")
             return False
         
-        # 步骤2: 获取股票价格数据
-        if run_command("python get_price.py", "获取股票价格数据", cwd="get_data"):
-            success_steps += 1
-        else:
-            logger.error("获取价格数据失败")
-            return False
-        
-        # 步骤3: 获取EPS数据
-        if run_command("python get_EPS.py", "获取EPS预测数据", cwd="get_data"):
-            success_steps += 1
-        else:
-            logger.error("获取EPS数据失败")
-            return False
+        # 其余步骤: 获取价格/EPS数据 -> 处理Excel数据 -> 同步到飞书
+        from complete_sync import build_pipeline, export_run_report
+        from pipeline import STATUS_OK, run_pipeline
+        from telemetry import telemetry
         
-        # 步骤4: 处理Excel数据
-        if run_command("python fill_excel_data.py", "处理Excel数据"):
-            success_steps += 1
-        else:
-            logger.error("处理Excel数据失败")
-            return False
-        
-        # 步骤5: 同步到飞书
-        if run_command("python sync_to_feishu.py", "同步数据到飞书"):
-            success_steps += 1
-        else:
-            logger.error("同步到飞书失败")
+        telemetry.reset()
+        steps = build_pipeline()
+        total_steps = 1 + len(steps)
+        outcome = run_pipeline(steps)
+        success_steps += sum(1 for timing in outcome.timings.values() if timing.status == STATUS_OK)
+        outcome.log_report()
+        export_run_report(outcome)
+        if not outcome.success:
+            logger.error(f"流程未完成，成功步骤: {success_steps}/{total_steps}")
             return False
             
         # 完成
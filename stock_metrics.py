@@ -0,0 +1,104 @@
+"""
+财务指标计算
+以股票代码为键将自选表与价格、EPS数据连接，按列向量化计算PE、市值、目标价和潜在涨幅
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from get_data.watchlist import normalize_ticker
+
+logger = logging.getLogger(__name__)
+
+# 自选表中由本模块计算/填充的列
+METRIC_COLUMNS = [
+    'Current Price', 'EPS (2025E)', 'PE (2025E)', 'Market Cap (CNY bn)',
+    'Mid Target', 'Potential Upside %'
+]
+
+
+
+def select_eps_year(df_eps: pd.DataFrame, year: int) -> pd.DataFrame:
+    """
+    筛选指定年度的EPS数据
+
+    akshare返回的年度为字符串，按数值比较，字符串和整数年度都能匹配；
+    没有该年度的数据时记录错误并返回空数据，EPS/PE为空，价格和市值等其余指标照常计算
+
+    Args:
+        df_eps: EPS数据，需包含 年度/均值/股票代码
+        year: 预测年度
+
+    Returns:
+        pd.DataFrame: 该年度的EPS数据，可能为空
+    """
+    df_year = df_eps[(pd.to_numeric(df_eps['年度'], errors='coerce') == year).fillna(False).astype(bool)]
+    if df_year.empty:
+        years = sorted(df_eps['年度'].dropna().astype(str).unique().tolist())
+        logger.error(f"❌ EPS数据中没有{year}年度的预测 (现有年度: {years or '无'})，EPS/PE将为空")
+    return df_year
+
+
+def build_lookup(df_price: pd.DataFrame, df_eps_2025: pd.DataFrame) -> pd.DataFrame:
+    """
+    构建以股票代码为索引的查找表
+
+    Args:
+        df_price: 价格数据，需包含 代码/最新价/总市值
+        df_eps_2025: 2025年EPS数据，需包含 股票代码/均值
+
+    Returns:
+        pd.DataFrame: 索引为股票代码，列为 price/market_cap/eps；代码重复时保留最后一条
+    """
+    price = df_price.drop_duplicates('代码', keep='last').set_index('代码')
+    eps = df_eps_2025.drop_duplicates('股票代码', keep='last').set_index('股票代码')
+    lookup = pd.DataFrame({
+        'price': price['最新价'],
+        'market_cap': price['总市值'],
+    })
+    return lookup.join(eps['均值'].rename('eps'), how='outer')
+
+
+def compute_metrics(df_excel: pd.DataFrame, df_price: pd.DataFrame, df_eps_2025: pd.DataFrame,
+                    updated_at: Optional[str] = None) -> pd.DataFrame:
+    """
+    计算自选表的财务指标
+
+    Args:
+        df_excel: 自选表，需包含 Ticker/Target Low/Target High
+        df_price: 价格数据
+        df_eps_2025: 2025年EPS数据
+        updated_at: 写入Last Updated列的时间字符串，None表示不写入
+
+    Returns:
+        pd.DataFrame: 填充了指标列的新数据框，行顺序与输入一致
+    """
+    result = df_excel.copy()
+    lookup = build_lookup(df_price, df_eps_2025)
+
+    tickers = normalize_ticker(result['Ticker']).rename('ticker').to_frame()
+    joined = tickers.merge(lookup, how='left', left_on='ticker', right_index=True)
+
+    current_price = joined['price'].to_numpy(dtype=float)
+    eps_mean = joined['eps'].to_numpy(dtype=float)
+    market_cap = joined['market_cap'].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pe_2025e = np.where(eps_mean != 0, current_price / eps_mean, np.nan)
+        mid_target = (result['Target Low'].to_numpy(dtype=float) + result['Target High'].to_numpy(dtype=float)) / 2
+        upside = np.where(current_price != 0, (mid_target / current_price - 1) * 100, np.nan)
+    # 与逐行计算时的Python round保持一致（np.round在部分.x5边界上结果不同）
+    potential_upside = np.array([round(v, 1) for v in upside.tolist()], dtype=float)
+
+    result['Current Price'] = current_price
+    result['EPS (2025E)'] = eps_mean
+    result['PE (2025E)'] = pe_2025e
+    result['Market Cap (CNY bn)'] = market_cap / 100000000
+    result['Mid Target'] = mid_target
+    result['Potential Upside %'] = potential_upside
+    if updated_at is not None:
+        result['Last Updated'] = updated_at
+
+    return result
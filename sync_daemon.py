@@ -0,0 +1,124 @@
+"""
+盘中常驻同步（complete_sync.py --daemon）
+EPS数据和飞书同步会话（客户端、token、字段转换表、Ticker映射、内容哈希）只在启动时加载一次并保留在内存中，
+交易时段内每隔固定间隔只刷新价格，重新计算指标后推送内容有变化的记录；
+非交易时段等待下一次开盘，收盘后再同步一轮收盘价
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from get_data.price_cache import BEIJING_TZ, in_trading_session, next_session_start
+
+logger = logging.getLogger(__name__)
+
+
+class SyncDaemon:
+    """按交易时段循环执行 价格 -> 指标计算 -> 推送 的常驻同步"""
+
+    def __init__(self, fetch_prices: Callable[[], Any], fetch_eps: Callable[[], Any],
+                 process: Callable[[Any, Any], Any], push: Callable[[Any], bool],
+                 interval: float = 30.0, eps_max_age: float = 24 * 3600,
+                 on_cycle: Optional[Callable[[bool, float], None]] = None,
+                 is_trading: Callable[[float], bool] = in_trading_session,
+                 next_open: Callable[[float], float] = next_session_start):
+        """
+        Args:
+            fetch_prices: 获取价格数据，失败返回False
+            fetch_eps: 获取EPS数据，失败返回False
+            process: 用 (价格, EPS) 计算自选表，失败返回False
+            push: 推送计算结果，返回是否成功
+            interval: 交易时段内两轮同步的间隔（秒，从上一轮开始算起）
+            eps_max_age: EPS数据在内存中保留的最长时间（秒），超过后重新获取
+            on_cycle: 每轮结束后以 (是否成功, 用时) 调用
+            is_trading: 判断某一时刻是否处于交易时段
+            next_open: 返回某一时刻之后最近一次开盘的时间
+        """
+        self.fetch_prices = fetch_prices
+        self.fetch_eps = fetch_eps
+        self.process = process
+        self.push = push
+        self.interval = max(1.0, interval)
+        self.eps_max_age = eps_max_age
+        self.on_cycle = on_cycle
+        self.is_trading = is_trading
+        self.next_open = next_open
+        self.df_eps = None
+        self.eps_loaded_at = 0.0
+        self.cycles = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        """请求停止；正在执行的一轮完成后退出"""
+        self._stop.set()
+
+    def _ensure_eps(self) -> bool:
+        if self.df_eps is not None and time.monotonic() - self.eps_loaded_at < self.eps_max_age:
+            return True
+        df_eps = self.fetch_eps()
+        if df_eps is False:
+            # 刷新失败时继续使用内存中的旧数据
+            return self.df_eps is not None
+        self.df_eps = df_eps
+        self.eps_loaded_at = time.monotonic()
+        return True
+
+    def cycle(self) -> bool:
+        """执行一轮同步"""
+        self.cycles += 1
+        start = time.monotonic()
+        ok = False
+        try:
+            if not self._ensure_eps():
+                logger.error("❌ 没有可用的EPS数据，跳过本轮")
+                return False
+            df_price = self.fetch_prices()
+            if df_price is False:
+                return False
+            df = self.process(df_price, self.df_eps)
+            if df is False:
+                return False
+            ok = bool(self.push(df))
+            return ok
+        except Exception as e:
+            logger.error(f"❌ 第{self.cycles}轮同步异常: {str(e)}")
+            return False
+        finally:
+            elapsed = time.monotonic() - start
+            mark = "✅" if ok else "❌"
+            logger.info(f"{mark} 第{self.cycles}轮同步完成，用时 {elapsed:.2f}秒")
+            if self.on_cycle is not None:
+                self.on_cycle(ok, elapsed)
+
+    def run(self, max_cycles: Optional[int] = None):
+        """
+        循环执行直到stop()被调用
+
+        启动时先同步一轮；之后交易时段内每interval秒一轮，收盘后再同步一轮，非交易时段等待开盘
+
+        Args:
+            max_cycles: 最多执行的轮数，None表示不限
+        """
+        logger.info(f"🔁 常驻同步已启动，交易时段内每 {self.interval:.0f} 秒刷新一次价格")
+        was_trading = True
+        while not self._stop.is_set():
+            now = time.time()
+            trading = self.is_trading(now)
+            if trading or was_trading:
+                started = time.monotonic()
+                self.cycle()
+                if max_cycles is not None and self.cycles >= max_cycles:
+                    break
+                was_trading = trading
+                self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+                continue
+
+            wake_at = self.next_open(now)
+            wake_text = datetime.fromtimestamp(wake_at, BEIJING_TZ).strftime('%Y-%m-%d %H:%M:%S CST')
+            logger.info(f"💤 非交易时段，等待到 {wake_text}")
+            # 分段等待，系统休眠或时钟调整后也能及时醒来
+            self._stop.wait(min(max(0.0, wake_at - now), 3600))
+            was_trading = False
+        logger.info(f"🛑 常驻同步已停止，共执行 {self.cycles} 轮")
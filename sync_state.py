@@ -0,0 +1,148 @@
+"""
+同步变更检测
+比较待推送记录与上次推送的内容（本地哈希）或飞书当前值（远端比对），跳过未变化的记录
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+from typing import List, Dict, Any, Optional, Tuple
+
+from feishu_records import iter_records, field_text
+from get_data.atomic_file import atomic_open
+
+logger = logging.getLogger(__name__)
+
+# 每次运行都会变化、不参与比较的字段
+IGNORED_FIELDS = {'Last Updated'}
+
+# 变更检测模式
+DIFF_MODE_OFF = 'off'        # 不做比较，全部推送
+DIFF_MODE_HASH = 'hash'      # 与本地保存的上次推送内容哈希比较
+DIFF_MODE_REMOTE = 'remote'  # 读取飞书当前值比较
+DIFF_MODE_AUTO = 'auto'      # 有本地状态时用hash，否则用remote
+
+
+def _normalize_value(value) -> str:
+    """统一本地值与飞书返回值的表示，缺失/空值/NaN视为空字符串"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and math.isnan(value):
+            return ""
+        return repr(float(value))
+    if isinstance(value, (list, dict)):
+        return field_text(value)
+    return str(value)
+
+
+def record_fingerprint(fields: Dict[str, Any], field_names: Optional[List[str]] = None) -> str:
+    """
+    计算记录内容哈希
+
+    Args:
+        fields: 字段字典
+        field_names: 参与比较的字段，None表示使用fields中的全部字段
+
+    Returns:
+        str: 内容哈希
+    """
+    names = field_names if field_names is not None else list(fields.keys())
+    payload = [
+        (name, _normalize_value(fields.get(name)))
+        for name in sorted(names) if name not in IGNORED_FIELDS
+    ]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class SyncStateStore:
+    """本地同步状态：记录每个record_id上次成功推送内容的哈希"""
+
+    def __init__(self, path: str, table_key: str):
+        """
+        初始化状态存储
+
+        Args:
+            path: 状态文件路径
+            table_key: 数据表标识（app_token/table_id），切换表格时旧状态失效
+        """
+        self.path = path
+        self.table_key = table_key
+        self.hashes: Dict[str, str] = {}
+        self.loaded = False
+
+    def load(self) -> "SyncStateStore":
+        if not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('table') == self.table_key:
+                self.hashes = state.get('records', {})
+                self.loaded = True
+            else:
+                logger.info("ℹ️ 同步状态属于其他数据表，忽略")
+        except Exception as e:
+            logger.warning(f"⚠️ 同步状态文件损坏，忽略: {e}")
+        return self
+
+    def save(self):
+        with atomic_open(self.path) as f:
+            json.dump({'table': self.table_key, 'records': self.hashes}, f, ensure_ascii=False)
+
+    def mark_pushed(self, updates: List[Dict[str, Any]], succeeded_ids: List[str]):
+        """记录成功推送的记录内容哈希"""
+        succeeded = set(succeeded_ids)
+        for item in updates:
+            if item['record_id'] in succeeded:
+                self.hashes[item['record_id']] = record_fingerprint(item['fields'])
+
+
+def load_remote_state(client, option, app_token: str, table_id: str,
+                      field_names: List[str], ticker_field: str = 'Ticker') -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    一次分页读取同时构建 Ticker -> record_id 映射和飞书当前内容哈希
+
+    Args:
+        field_names: 参与比较的字段名（飞书字段名）
+
+    Returns:
+        Tuple[Dict[str, str], Dict[str, str]]: (Ticker映射, record_id -> 内容哈希)
+    """
+    projection = [ticker_field] + [name for name in field_names
+                                   if name != ticker_field and name not in IGNORED_FIELDS]
+    ticker_map = {}
+    remote_hashes = {}
+    record_count = 0
+
+    for record in iter_records(client, option, app_token, table_id, field_names=projection):
+        record_count += 1
+        fields = record.fields or {}
+        ticker = field_text(fields.get(ticker_field))
+        if ticker:
+            ticker_map[ticker] = record.record_id
+        remote_hashes[record.record_id] = record_fingerprint(fields, field_names)
+
+    logger.info(f"📋 获取到飞书记录: {record_count} 条（含 {len(projection)} 个比较字段）")
+    return ticker_map, remote_hashes
+
+
+def filter_changed(updates: List[Dict[str, Any]], baseline: Dict[str, str]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    过滤掉内容与基线一致的记录
+
+    Args:
+        updates: [{'record_id': ..., 'fields': {...}}, ...]
+        baseline: record_id -> 内容哈希
+
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: (需要推送的记录, 跳过的记录数)
+    """
+    changed = [
+        item for item in updates
+        if baseline.get(item['record_id']) != record_fingerprint(item['fields'])
+    ]
+    return changed, len(updates) - len(changed)
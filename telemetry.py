@@ -0,0 +1,229 @@
+"""
+运行指标采集
+记录流水线各步骤和每次外部调用（akshare获取、token获取、列出记录分页、批量写入）的
+用时、次数、字节数、重试次数和错误码，汇总为JSON运行报告和Prometheus textfile
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from get_data.atomic_file import atomic_open
+
+logger = logging.getLogger(__name__)
+
+# Prometheus指标名前缀
+METRIC_PREFIX = 'stock_sync'
+
+
+class CallStats:
+    """一类外部调用的累计统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.error_codes: Counter = Counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'total_seconds': round(self.total_seconds, 6),
+            'avg_seconds': round(self.total_seconds / self.count, 6) if self.count else 0.0,
+            'max_seconds': round(self.max_seconds, 6),
+            'error_codes': dict(self.error_codes),
+        }
+
+
+class CallRecord:
+    """一次进行中的调用，调用方可在其中登记响应字节数和错误码"""
+
+    def __init__(self):
+        self.bytes = 0
+        self.error_code: Optional[str] = None
+
+
+class Telemetry:
+    """线程安全的运行指标收集器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: Dict[str, CallStats] = {}
+        self.started_at = time.time()
+
+    def reset(self):
+        """清空已收集的指标，开始新一次运行"""
+        with self._lock:
+            self.calls = {}
+            self.started_at = time.time()
+
+    def _stats(self, kind: str) -> CallStats:
+        stats = self.calls.get(kind)
+        if stats is None:
+            stats = self.calls[kind] = CallStats()
+        return stats
+
+    def record_call(self, kind: str, seconds: float, nbytes: int = 0, error_code: Optional[str] = None):
+        """
+        记录一次外部调用
+
+        Args:
+            kind: 调用类别，如 akshare.stock_zh_a_spot_em、feishu.list_records
+            seconds: 用时
+            nbytes: 响应字节数
+            error_code: 错误码，None表示成功
+        """
+        with self._lock:
+            stats = self._stats(kind)
+            stats.count += 1
+            stats.bytes += nbytes
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            if error_code is not None:
+                stats.errors += 1
+                stats.error_codes[str(error_code)] += 1
+
+    def record_retry(self, kind: str, count: int = 1):
+        """记录调用的重试次数"""
+        with self._lock:
+            self._stats(kind).retries += count
+
+    @contextmanager
+    def track(self, kind: str) -> Iterator[CallRecord]:
+        """
+        计时一次外部调用；抛出异常时以异常类名作为错误码
+
+        Usage:
+            with telemetry.track('feishu.list_records') as call:
+                response = ...
+                call.bytes = len(response.raw.content)
+        """
+        record = CallRecord()
+        start = time.monotonic()
+        try:
+            yield record
+        except BaseException as e:
+            if record.error_code is None:
+                record.error_code = type(e).__name__
+            raise
+        finally:
+            self.record_call(kind, time.monotonic() - start, record.bytes, record.error_code)
+
+    def build_report(self, outcome=None) -> Dict[str, Any]:
+        """
+        汇总运行报告
+
+        Args:
+            outcome: pipeline.PipelineResult，None表示只汇总外部调用
+        """
+        with self._lock:
+            calls = {kind: stats.to_dict() for kind, stats in sorted(self.calls.items())}
+        report: Dict[str, Any] = {
+            'started_at': self.started_at,
+            'finished_at': time.time(),
+            'calls': calls,
+        }
+        if outcome is not None:
+            path, length = outcome.critical_path()
+            report.update({
+                'success': outcome.success,
+                'duration_seconds': round(outcome.total_seconds, 6),
+                'critical_path': path,
+                'critical_path_seconds': round(length, 6),
+                'steps': {
+                    name: {'status': timing.status, 'duration_seconds': round(timing.duration, 6)}
+                    for name, timing in outcome.timings.items()
+                },
+            })
+        return report
+
+
+def _label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(report: Dict[str, Any], prefix: str = METRIC_PREFIX) -> str:
+    """将运行报告转为Prometheus文本格式"""
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+
+    metric('last_run_timestamp_seconds', 'gauge', "Unix time the run finished",
+           [({}, round(report['finished_at'], 3))])
+    if 'success' in report:
+        metric('run_success', 'gauge', "1 if every pipeline step succeeded", [({}, int(report['success']))])
+        metric('run_duration_seconds', 'gauge', "Wall-clock duration of the pipeline",
+               [({}, report['duration_seconds'])])
+    if 'steps' in report:
+        metric('critical_path_seconds', 'gauge', "Duration of the pipeline critical path",
+               [({}, report['critical_path_seconds'])])
+        metric('step_duration_seconds', 'gauge', "Duration of each pipeline step",
+               [({'step': name, 'status': step['status']}, step['duration_seconds'])
+                for name, step in report['steps'].items()])
+
+    # 每次运行重新统计，均为本次运行的取值（gauge），不是跨运行累计的counter
+    calls = report['calls']
+    metric('calls', 'gauge', "Outbound calls made during the run",
+           [({'call': kind}, stats['count']) for kind, stats in calls.items()])
+    metric('call_errors', 'gauge', "Failed outbound calls during the run by error code",
+           [({'call': kind, 'code': code}, count)
+            for kind, stats in calls.items() for code, count in stats['error_codes'].items()])
+    metric('call_retries', 'gauge', "Retries of outbound calls during the run",
+           [({'call': kind}, stats['retries']) for kind, stats in calls.items()])
+    metric('call_response_bytes', 'gauge', "Response bytes received during the run",
+           [({'call': kind}, stats['bytes']) for kind, stats in calls.items()])
+    metric('call_duration_seconds', 'gauge', "Total time spent in outbound calls during the run",
+           [({'call': kind}, stats['total_seconds']) for kind, stats in calls.items()])
+    metric('call_max_duration_seconds', 'gauge', "Slowest single outbound call during the run",
+           [({'call': kind}, stats['max_seconds']) for kind, stats in calls.items()])
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report: Dict[str, Any], json_path: Optional[str] = None, prom_path: Optional[str] = None):
+    """
+    写出运行报告（原子替换，textfile collector不会读到半个文件）
+
+    Args:
+        report: build_report的结果
+        json_path: JSON报告路径，None表示不写
+        prom_path: Prometheus textfile路径，None表示不写
+    """
+    if json_path:
+        with atomic_open(json_path) as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if prom_path:
+        with atomic_open(prom_path) as f:
+            f.write(prometheus_text(report))
+
+
+def log_call_summary(report: Dict[str, Any]):
+    """在日志中输出外部调用汇总"""
+    if not report['calls']:
+        return
+    logger.info("📡 外部调用:")
+    for kind, stats in report['calls'].items():
+        extra = f"，{stats['bytes'] / 1024:.1f} KB" if stats['bytes'] else ""
+        if stats['retries']:
+            extra += f"，重试 {stats['retries']} 次"
+        if stats['errors']:
+            extra += f"，失败 {stats['errors']} 次 {stats['error_codes']}"
+        logger.info(f"  {kind}: {stats['count']} 次，共 {stats['total_seconds']:.2f}秒，"
+                    f"最长 {stats['max_seconds']:.2f}秒{extra}")
+
+
+# 进程内共享的指标收集器
+telemetry = Telemetry()